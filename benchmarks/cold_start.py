@@ -0,0 +1,118 @@
+"""
+Measure the cold start of a worker: a fresh interpreter imports the bot
+module and runs create_app() with the given config, the startup report
+(import, config, setup, per bot init, backend imports, app build) is printed
+as JSON.
+
+Exits with status 1 when the best total startup time exceeds --budget
+(DEFAULT_BUDGET seconds unless given, 0 disables the check), CI runs it on
+every push to catch import time regressions. Without -c a config with one
+bot per LangChain backend is generated, no upstream is contacted.
+
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py -c ./configs/config.toml --budget 2.0
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot")
+
+# seconds, generous for a CI runner; the LangChain backend imports dominate
+DEFAULT_BUDGET = 5.0
+
+CI_CONFIG = """
+log_file_path = "{log_file}"
+
+[[bot_configs]]
+bot_type = "openai"
+bot_name = "cold_start_openai"
+model = "gpt-4o"
+api_base = "http://127.0.0.1:9/v1"
+api_key = "cold-start"
+poe_key = "cold-start"
+sub_url = "/openai"
+
+[[bot_configs]]
+bot_type = "ollama"
+bot_name = "cold_start_ollama"
+model = "llama3"
+api_base = "http://127.0.0.1:9"
+api_key = "cold-start"
+poe_key = "cold-start"
+sub_url = "/ollama"
+"""
+
+
+def write_ci_config(directory: str) -> str:
+    path = os.path.join(directory, "config.toml")
+    with open(path, "w") as f:
+        f.write(CI_CONFIG.format(log_file=os.path.join(directory, "app.log")))
+    return path
+
+WORKER_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from startup import StartupTimer
+timer = StartupTimer()
+with timer.phase("import"):
+    import bot
+app = bot.create_app(timer)
+report = app.state.startup.to_dict()
+report["wall"] = round(time.perf_counter() - start, 4)
+print("STARTUP_REPORT " + json.dumps(report))
+"""
+
+
+def run_once(config_path: str) -> dict:
+    env = dict(os.environ, POE_BOTS_CONFIG=os.path.abspath(config_path))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER_SCRIPT],
+        cwd=BOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    process_seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Worker failed:\n{result.stderr}")
+
+    for line in result.stdout.splitlines():
+        if line.startswith("STARTUP_REPORT "):
+            report = json.loads(line[len("STARTUP_REPORT "):])
+            report["process"] = round(process_seconds, 4)
+            return report
+    raise RuntimeError(f"No startup report in the worker output:\n{result.stdout}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker cold start benchmark")
+    parser.add_argument("-c", "--config", type=str, default=None, help="Path to the configuration file, generated if not set")
+    parser.add_argument("--runs", type=int, default=3, help="Number of fresh processes to start")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Maximum allowed startup seconds (best run), 0 to disable")
+    parser.add_argument("--output", type=str, default=None, help="Write the reports to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = args.config or write_ci_config(directory)
+        reports = [run_once(config_path) for _ in range(args.runs)]
+    best = min(reports, key=lambda report: report["total"])
+
+    print(json.dumps({"best": best, "runs": reports}, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"best": best, "runs": reports}, f, indent=2)
+
+    if args.budget and best["total"] > args.budget:
+        print(f"Startup took {best['total']:.3f}s, over the budget of {args.budget:.3f}s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
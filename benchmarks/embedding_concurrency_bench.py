@@ -0,0 +1,97 @@
+"""
+Latency of the embedding service (bot/test.py) under concurrent load.
+
+Sends small requests at the given concurrency while a few clients keep
+sending large requests, and reports the p50/p95/p99 latency of both. Run it
+once per executor setting of the service and compare the JSON results, e.g.
+
+    EMBEDDING_EXECUTOR=inline uvicorn test:app --app-dir bot --port 6008
+    python benchmarks/embedding_concurrency_bench.py --output inline.json
+    EMBEDDING_EXECUTOR=thread EMBEDDING_EXECUTOR_WORKERS=2 uvicorn test:app --app-dir bot --port 6008
+    python benchmarks/embedding_concurrency_bench.py --output thread.json
+
+inline runs inference on the event loop like the service used to, so the
+small requests wait behind every large one.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import httpx
+
+
+def percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))] * 1000, 2)
+
+    return {"p50": rank(0.50), "p95": rank(0.95), "p99": rank(0.99)}
+
+
+async def client_loop(client: httpx.AsyncClient, args, size: int, latencies: List[float], errors: List[str], stop: float):
+    texts = [f"benchmark sentence number {i} about embeddings and latency" for i in range(size)]
+    while time.perf_counter() < stop:
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                args.url,
+                json={"input": texts, "model": args.model},
+                headers={"Authorization": f"Bearer {args.key}"},
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        except httpx.HTTPError as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+
+async def run(args) -> Dict:
+    small: List[float] = []
+    large: List[float] = []
+    errors: List[str] = []
+    limits = httpx.Limits(max_connections=args.concurrency + args.large_clients)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        stop = time.perf_counter() + args.duration
+        await asyncio.gather(
+            *(client_loop(client, args, args.small_size, small, errors, stop) for _ in range(args.concurrency)),
+            *(client_loop(client, args, args.large_size, large, errors, stop) for _ in range(args.large_clients)),
+        )
+    return {
+        "settings": vars(args),
+        "small": {"requests": len(small), "latency_ms": percentiles(small)},
+        "large": {"requests": len(large), "latency_ms": percentiles(large)},
+        "errors": len(errors),
+        "texts_per_second": round(
+            (len(small) * args.small_size + len(large) * args.large_size) / args.duration, 2
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding service concurrency benchmark")
+    parser.add_argument("--url", type=str, default="http://localhost:6008/v1/embeddings", help="Embeddings endpoint")
+    parser.add_argument("--key", type=str, default="sk-aaabbbcccdddeeefffggghhhiiijjjkkk", help="API key")
+    parser.add_argument("--model", type=str, default="m3e", help="Model name sent in the requests")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients sending small requests")
+    parser.add_argument("--small-size", type=int, default=1, help="Texts per small request")
+    parser.add_argument("--large-clients", type=int, default=2, help="Clients sending large requests")
+    parser.add_argument("--large-size", type=int, default=256, help="Texts per large request")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per request timeout in seconds")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
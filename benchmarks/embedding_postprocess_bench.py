@@ -0,0 +1,71 @@
+"""
+Compare the embedding post processing of the embedding service (bot/test.py):
+per item PolynomialFeatures expansion, normalization and tolist against the
+batched expand_features_batch / normalize_rows path, and check that both
+produce identical vectors.
+
+Requires numpy and scikit-learn.
+
+    python benchmarks/embedding_postprocess_bench.py --dim 1024 --batch 32
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+
+from embedding_utils import expand_features, expand_features_batch, normalize_rows  # noqa: E402
+
+TARGET_LENGTH = 1536
+
+
+def per_item(embeddings: np.ndarray) -> list:
+    expanded = [
+        expand_features(embedding, TARGET_LENGTH) if len(embedding) < TARGET_LENGTH else embedding
+        for embedding in embeddings
+    ]
+    normalized = [embedding / np.linalg.norm(embedding) for embedding in expanded]
+    return [embedding.tolist() for embedding in normalized]
+
+
+def batched(embeddings: np.ndarray) -> list:
+    if embeddings.shape[1] < TARGET_LENGTH:
+        embeddings = expand_features_batch(embeddings, TARGET_LENGTH)
+    return normalize_rows(embeddings).tolist()
+
+
+def bench(func, embeddings: np.ndarray, runs: int) -> float:
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(embeddings)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding post processing benchmark")
+    parser.add_argument("--dim", type=int, nargs="+", default=[384, 768, 1024], help="Model embedding sizes")
+    parser.add_argument("--batch", type=int, default=32, help="Embeddings per request")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per path, the best one is reported")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'dim':>6} | {'per item ms':>12} | {'batched ms':>12} | {'speedup':>8} | identical")
+    for dim in args.dim:
+        embeddings = rng.standard_normal((args.batch, dim)).astype(np.float32)
+        identical = per_item(embeddings) == batched(embeddings)
+        old = bench(per_item, embeddings, args.runs)
+        new = bench(batched, embeddings, args.runs)
+        print(f"{dim:>6} | {old * 1000:>12.2f} | {new * 1000:>12.2f} | {old / new:>7.1f}x | {identical}")
+        if not identical:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
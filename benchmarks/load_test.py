@@ -0,0 +1,338 @@
+"""
+End to end load test of the bot server against the local mock LLM server.
+
+Starts benchmarks/mock_llm.py and the app built by main() in bot/bot.py
+(through bot.py, so workers and logging are set up as in production), drives
+the Poe protocol at the target concurrency and reports p50/p95/p99 time to
+first token, stream duration, throughput and the CPU and RSS of the server
+processes. Results are saved as JSON so runs can be compared.
+
+    python benchmarks/load_test.py --bot-type openai_native --concurrency 50 --requests 1000
+    python benchmarks/load_test.py --bot-option coalesce_window_ms=20 --output results/coalesce.json
+
+Server CPU and RSS are read from /proc and are only reported on Linux.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import toml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm import add_mock_arguments  # noqa: E402
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BOT_SCRIPT = os.path.join(ROOT_DIR, "bot", "bot.py")
+MOCK_SCRIPT = os.path.join(ROOT_DIR, "benchmarks", "mock_llm.py")
+
+BOT_PATH = "/bench"
+POE_KEY = "bench-poe-key"
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+    return {
+        "p50": round(rank(0.50), 4),
+        "p95": round(rank(0.95), 4),
+        "p99": round(rank(0.99), 4),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+class ProcessSampler:
+    """
+    Samples the CPU time and RSS of a process and its children from /proc
+    """
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.enabled = os.path.isdir(f"/proc/{pid}")
+        self.clock_ticks = os.sysconf("SC_CLK_TCK") if self.enabled else 1
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if self.enabled else 1
+        self.rss_peak = 0
+
+    def _tree(self) -> List[int]:
+        parents: Dict[int, List[int]] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            parents.setdefault(int(fields[1]), []).append(int(entry))
+
+        pids, stack = [], [self.pid]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            stack.extend(parents.get(pid, []))
+        return pids
+
+    def sample(self) -> Dict[str, float]:
+        if not self.enabled:
+            return {"cpu_seconds": 0.0, "rss_bytes": 0}
+        cpu, rss = 0.0, 0
+        for pid in self._tree():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{pid}/statm") as f:
+                    rss += int(f.read().split()[1]) * self.page_size
+            except OSError:
+                continue
+            # utime and stime, fields 14 and 15 of /proc/<pid>/stat
+            cpu += (int(fields[11]) + int(fields[12])) / self.clock_ticks
+        self.rss_peak = max(self.rss_peak, rss)
+        return {"cpu_seconds": cpu, "rss_bytes": rss}
+
+    async def watch(self, interval: float = 0.5):
+        while True:
+            self.sample()
+            await asyncio.sleep(interval)
+
+
+def poe_query(index: int, prompt: str) -> Dict:
+    return {
+        "version": "1.0",
+        "type": "query",
+        "query": [{"role": "user", "content": f"{prompt} #{index}", "content_type": "text/markdown"}],
+        "user_id": "bench-user",
+        "conversation_id": f"bench-conversation-{index}",
+        "message_id": f"bench-message-{index}",
+    }
+
+
+async def run_request(client: httpx.AsyncClient, url: str, body: Dict) -> Dict:
+    result = {"ok": False, "ttft": None, "duration": None, "chars": 0, "error": None}
+    start = time.perf_counter()
+    event = None
+    try:
+        async with client.stream(
+            "POST", url, json=body, headers={"Authorization": f"Bearer {POE_KEY}"}
+        ) as response:
+            if response.status_code != 200:
+                result["error"] = f"HTTP {response.status_code}"
+                return result
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:") and event in ("text", "replace_response"):
+                    text = json.loads(line[len("data:"):]).get("text", "")
+                    if text and result["ttft"] is None:
+                        result["ttft"] = time.perf_counter() - start
+                    result["chars"] += len(text)
+                elif line.startswith("data:") and event == "error":
+                    result["error"] = json.loads(line[len("data:"):]).get("text", "error")
+                elif line.startswith("data:") and event == "done":
+                    result["ok"] = result["error"] is None
+    except httpx.HTTPError as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["duration"] = time.perf_counter() - start
+    return result
+
+
+async def run_load(url: str, requests: int, concurrency: int, prompt: str, timeout: float) -> List[Dict]:
+    results: List[Dict] = []
+    counter = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+
+        async def worker():
+            for index in counter:
+                results.append(await run_request(client, url, poe_query(index, prompt)))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def write_config(path: str, args: argparse.Namespace, mock_base: str):
+    bot_config = {
+        "bot_name": "bench_bot",
+        "bot_type": args.bot_type,
+        "model": "mock-model",
+        "api_base": f"{mock_base}/v1" if args.bot_type.startswith("openai") else mock_base,
+        "api_key": "mock-key",
+        "poe_key": POE_KEY,
+        "sub_url": BOT_PATH,
+    }
+    for option in args.bot_option:
+        key, value = option.split("=", 1)
+        try:
+            bot_config[key] = json.loads(value)
+        except json.JSONDecodeError:
+            bot_config[key] = value
+
+    config = {
+        "listen_host": "127.0.0.1",
+        "listen_port": args.port,
+        "workers": args.workers,
+        "console_log_level": "WARNING",
+        "file_log_level": "WARNING",
+        "log_file_path": os.path.join(os.path.dirname(path), "bench.log"),
+        "access_log_sample_rate": 0.0,
+        "bot_configs": [bot_config],
+    }
+    with open(path, "w") as f:
+        toml.dump(config, f)
+
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with status {process.returncode}")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+async def bench(args: argparse.Namespace) -> Dict:
+    mock_base = f"http://127.0.0.1:{args.mock_port}"
+    server_base = f"http://127.0.0.1:{args.port}"
+    processes: List[subprocess.Popen] = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config.toml")
+        write_config(config_path, args, mock_base)
+
+        mock_args = [
+            "--port", str(args.mock_port),
+            "--ttft", str(args.ttft),
+            "--tokens-per-second", str(args.tokens_per_second),
+            "--tokens", str(args.tokens),
+            "--token-bytes", str(args.token_bytes),
+            "--error-rate", str(args.error_rate),
+        ]
+        try:
+            processes.append(subprocess.Popen([sys.executable, MOCK_SCRIPT, *mock_args]))
+            await wait_ready(f"{mock_base}/health", processes[-1])
+            processes.append(subprocess.Popen([sys.executable, BOT_SCRIPT, "-c", config_path], cwd=tmp_dir))
+            await wait_ready(f"{server_base}/health", processes[-1])
+
+            url = f"{server_base}{BOT_PATH}"
+            if args.warmup:
+                await run_load(url, args.warmup, min(args.warmup, args.concurrency), args.prompt, args.timeout)
+
+            sampler = ProcessSampler(processes[-1].pid)
+            before = sampler.sample()
+            watcher = asyncio.create_task(sampler.watch())
+            start = time.perf_counter()
+            results = await run_load(url, args.requests, args.concurrency, args.prompt, args.timeout)
+            elapsed = time.perf_counter() - start
+            watcher.cancel()
+            after = sampler.sample()
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    ok = [result for result in results if result["ok"]]
+    errors: Dict[str, int] = {}
+    for result in results:
+        if not result["ok"]:
+            errors[result["error"] or "incomplete"] = errors.get(result["error"] or "incomplete", 0) + 1
+
+    cpu_seconds = after["cpu_seconds"] - before["cpu_seconds"]
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "settings": vars(args),
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": errors,
+        "elapsed": round(elapsed, 4),
+        "ttft": percentiles([result["ttft"] for result in ok if result["ttft"] is not None]),
+        "duration": percentiles([result["duration"] for result in ok]),
+        "throughput": {
+            "requests_per_second": round(len(ok) / elapsed, 2),
+            "chars_per_second": round(sum(result["chars"] for result in ok) / elapsed, 2),
+        },
+        "server": {
+            "cpu_seconds": round(cpu_seconds, 3),
+            "cpu_percent": round(100 * cpu_seconds / elapsed, 1),
+            "rss_peak_bytes": sampler.rss_peak,
+            "rss_end_bytes": after["rss_bytes"],
+        }
+        if sampler.enabled
+        else None,
+    }
+
+
+def print_summary(report: Dict):
+    print(f"requests: {report['requests']}  ok: {report['ok']}  errors: {report['errors']}")
+    print(f"{'':>10} | {'p50':>8} | {'p95':>8} | {'p99':>8}")
+    for name in ("ttft", "duration"):
+        stats = report[name]
+        row = " | ".join(f"{stats[q] if stats[q] is not None else '-':>8}" for q in ("p50", "p95", "p99"))
+        print(f"{name:>10} | {row}")
+    throughput = report["throughput"]
+    print(f"throughput: {throughput['requests_per_second']} req/s, {throughput['chars_per_second']} chars/s")
+    if report["server"]:
+        server = report["server"]
+        print(
+            f"server: {server['cpu_percent']}% cpu, "
+            f"{server['rss_peak_bytes'] / 1024 / 1024:.1f}MiB peak rss"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End to end load test against a mock LLM server")
+    parser.add_argument("--bot-type", type=str, default="openai", help="bot_type of the benchmarked bot")
+    parser.add_argument(
+        "--bot-option", type=str, action="append", default=[], help="Extra bot config KEY=VALUE, repeatable"
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Server worker processes")
+    parser.add_argument("--port", type=int, default=18100, help="Bot server port")
+    parser.add_argument("--mock-port", type=int, default=18000, help="Mock LLM server port")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent Poe requests")
+    parser.add_argument("--requests", type=int, default=500, help="Total Poe requests")
+    parser.add_argument("--warmup", type=int, default=20, help="Requests sent before measuring")
+    parser.add_argument("--prompt", type=str, default="Tell me a story", help="Prompt of every request")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per request timeout in seconds")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report to this file")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(bench(args))
+    print_summary(report)
+
+    output = args.output or os.path.join(
+        ROOT_DIR, "benchmarks", "results", f"load_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {output}")
+
+
+if __name__ == "__main__":
+    main()
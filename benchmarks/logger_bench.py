@@ -0,0 +1,62 @@
+"""
+Measure the per log call cost of LoggerManager as the number of loggers grows.
+
+With one shared handler tree on the "bot" root logger the cost per call must
+stay flat, no matter how many bots (loggers) were created before.
+
+    python benchmarks/logger_bench.py --calls 20000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+
+from logger import LoggerManager, set_logger_manager  # noqa: E402
+
+
+def bench(manager: LoggerManager, loggers: int, calls: int) -> float:
+    for i in range(loggers):
+        manager.get_logger(f"bench_bot_{i}")
+    logger = manager.get_logger("bench_bot_0")
+
+    start = time.perf_counter()
+    for i in range(calls):
+        logger.info("request %d handled", i)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LoggerManager per call benchmark")
+    parser.add_argument("--calls", type=int, default=20000, help="Log calls per measurement")
+    parser.add_argument(
+        "--loggers", type=int, nargs="+", default=[1, 10, 100, 1000], help="Logger counts to measure"
+    )
+    parser.add_argument("--async-mode", action="store_true", help="Use the queue based pipeline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = LoggerManager(
+            console_level="CRITICAL",
+            file_level="INFO",
+            log_file=os.path.join(tmp_dir, "bench.log"),
+            async_mode=args.async_mode,
+            queue_size=args.calls * 2,
+        )
+        set_logger_manager(manager)
+
+        print(f"{'loggers':>8} | {'us/call':>8} | {'handlers':>8}")
+        for count in args.loggers:
+            per_call = bench(manager, count, args.calls)
+            handlers = len(logging.getLogger("bot").handlers)
+            print(f"{count:>8} | {per_call * 1e6:>8.2f} | {handlers:>8}")
+
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Local mock LLM server speaking the OpenAI (SSE, /v1/chat/completions) and the
+Ollama (NDJSON, /api/chat) streaming protocols, so the bots can be load
+tested without real API quota.
+
+The time to first token, tokens per second, error rate and size of every
+streamed token are configurable.
+
+    python benchmarks/mock_llm.py --port 18000 --ttft 0.2 --tokens-per-second 50
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class MockSettings:
+    ttft: float = 0.2  # seconds before the first token
+    tokens_per_second: float = 50.0  # 0 streams as fast as possible
+    tokens: int = 200  # tokens per response, capped by max_tokens / num_predict
+    token_bytes: int = 6  # size of every token
+    error_rate: float = 0.0  # fraction of requests answered with a 500
+
+
+def make_token(index: int, size: int) -> str:
+    token = f" t{index}"
+    return token.ljust(size, "x") if len(token) < size else token[:size]
+
+
+async def generate_tokens(settings: MockSettings, tokens: int):
+    await asyncio.sleep(settings.ttft)
+    start = time.perf_counter()
+    for i in range(tokens):
+        if settings.tokens_per_second > 0:
+            # schedule against the start time, so sleep jitter does not add up
+            delay = start + i / settings.tokens_per_second - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield make_token(i, settings.token_bytes)
+
+
+def create_mock_app(settings: MockSettings) -> FastAPI:
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.errors = 0
+
+    def should_fail() -> bool:
+        app.state.requests += 1
+        if settings.error_rate > 0 and random.random() < settings.error_rate:
+            app.state.errors += 1
+            return True
+        return False
+
+    def token_count(limit) -> int:
+        return min(settings.tokens, limit) if limit else settings.tokens
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def openai_chat(request: Request):
+        body = await request.json()
+        if should_fail():
+            return JSONResponse({"error": {"message": "mock error", "type": "server_error"}}, status_code=500)
+
+        model = body.get("model", "mock")
+        tokens = token_count(body.get("max_tokens") or body.get("max_completion_tokens"))
+
+        async def stream():
+            head = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+            first = {"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}
+            yield f"data: {json.dumps({**head, 'choices': [first]})}\n\n"
+            async for token in generate_tokens(settings, tokens):
+                choice = {"index": 0, "delta": {"content": token}, "finish_reason": None}
+                yield f"data: {json.dumps({**head, 'choices': [choice]})}\n\n"
+            last = {"index": 0, "delta": {}, "finish_reason": "stop"}
+            yield f"data: {json.dumps({**head, 'choices': [last]})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/api/chat")
+    async def ollama_chat(request: Request):
+        body = await request.json()
+        if should_fail():
+            return JSONResponse({"error": "mock error"}, status_code=500)
+
+        model = body.get("model", "mock")
+        tokens = token_count((body.get("options") or {}).get("num_predict"))
+
+        async def stream():
+            created_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            async for token in generate_tokens(settings, tokens):
+                event = {
+                    "model": model,
+                    "created_at": created_at,
+                    "message": {"role": "assistant", "content": token},
+                    "done": False,
+                }
+                yield json.dumps(event) + "\n"
+            done = {
+                "model": model,
+                "created_at": created_at,
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "done_reason": "stop",
+                "eval_count": tokens,
+            }
+            yield json.dumps(done) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", "requests": app.state.requests, "errors": app.state.errors}
+
+    return app
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    defaults = MockSettings()
+    parser.add_argument("--ttft", type=float, default=defaults.ttft, help="Seconds before the first token")
+    parser.add_argument(
+        "--tokens-per-second", type=float, default=defaults.tokens_per_second, help="Token rate, 0 for unlimited"
+    )
+    parser.add_argument("--tokens", type=int, default=defaults.tokens, help="Tokens per response")
+    parser.add_argument("--token-bytes", type=int, default=defaults.token_bytes, help="Size of every token")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Fraction of failed requests")
+
+
+def settings_from_args(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        tokens=args.tokens,
+        token_bytes=args.token_bytes,
+        error_rate=args.error_rate,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI / Ollama streaming server")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Listen host")
+    parser.add_argument("--port", type=int, default=18000, help="Listen port")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(create_mock_app(settings_from_args(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,145 @@
+"""
+Compare the per chunk CPU cost of the LangChain backends (ChatOpenAI,
+ChatOllama) with the native SSE/NDJSON backend.
+
+Both paths read the same canned stream from an in process httpx transport,
+so the numbers only contain the client side work per chunk: HTTP framing,
+parsing and, for LangChain, the message chunk objects and callbacks.
+
+    python benchmarks/native_stream_bench.py --chunks 5000 --runs 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+
+from native_bot import ChatMessage, NativeChatClient  # noqa: E402
+
+MODEL = "bench-model"
+API_KEY = "bench"
+PROMPT = "Say something long."
+
+
+def openai_events(chunks: int):
+    head = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 0, "model": MODEL}
+    yield {**head, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]}
+    for i in range(chunks):
+        yield {**head, "choices": [{"index": 0, "delta": {"content": f" tok{i}"}, "finish_reason": None}]}
+    yield {**head, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+
+def openai_body(chunks: int) -> list:
+    lines = [f"data: {json.dumps(event)}\n\n".encode() for event in openai_events(chunks)]
+    lines.append(b"data: [DONE]\n\n")
+    return lines
+
+
+def ollama_body(chunks: int) -> list:
+    lines = []
+    for i in range(chunks):
+        event = {
+            "model": MODEL,
+            "created_at": "2024-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": f" tok{i}"},
+            "done": False,
+        }
+        lines.append((json.dumps(event) + "\n").encode())
+    done = {
+        "model": MODEL,
+        "created_at": "2024-01-01T00:00:00Z",
+        "message": {"role": "assistant", "content": ""},
+        "done": True,
+        "done_reason": "stop",
+    }
+    lines.append((json.dumps(done) + "\n").encode())
+    return lines
+
+
+def make_transport(body: list, content_type: str) -> httpx.MockTransport:
+    async def stream():
+        for line in body:
+            yield line
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": content_type}, content=stream())
+
+    return httpx.MockTransport(handler)
+
+
+async def consume(stream) -> int:
+    count = 0
+    async for _ in stream:
+        count += 1
+    return count
+
+
+def bench(name: str, make_stream, chunks: int, runs: int):
+    best = None
+    for _ in range(runs):
+        start = time.process_time()
+        received = asyncio.run(consume(make_stream()))
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:>18} | {received:>8} | {best * 1e6 / chunks:>10.2f}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per chunk CPU cost of LangChain vs native streaming")
+    parser.add_argument("--chunks", type=int, default=5000, help="Chunks per streamed response")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per path, the best one is reported")
+    args = parser.parse_args()
+
+    from langchain_core.messages import HumanMessage
+    from langchain_ollama import ChatOllama
+    from langchain_openai import ChatOpenAI
+
+    openai_transport = make_transport(openai_body(args.chunks), "text/event-stream")
+    ollama_transport = make_transport(ollama_body(args.chunks), "application/x-ndjson")
+    api_base = "http://bench.local/v1"
+    ollama_base = "http://bench.local"
+
+    def langchain_openai():
+        model = ChatOpenAI(
+            model=MODEL,
+            api_key=API_KEY,
+            base_url=api_base,
+            http_async_client=httpx.AsyncClient(transport=openai_transport),
+        )
+        return (chunk.content async for chunk in model.astream([HumanMessage(content=PROMPT)]))
+
+    def langchain_ollama():
+        model = ChatOllama(model=MODEL, base_url=ollama_base, client_kwargs={"transport": ollama_transport})
+        return (chunk.content async for chunk in model.astream([HumanMessage(content=PROMPT)]))
+
+    def native(api_format: str, transport: httpx.MockTransport, base: str):
+        def make_stream():
+            client = NativeChatClient(
+                client=httpx.AsyncClient(transport=transport),
+                api_format=api_format,
+                api_base=base,
+                api_key=API_KEY,
+                model=MODEL,
+            )
+            return client.astream([ChatMessage("human", PROMPT)])
+
+        return make_stream
+
+    print(f"{'path':>18} | {'chunks':>8} | {'us/chunk':>10}")
+    lc_openai = bench("langchain openai", langchain_openai, args.chunks, args.runs)
+    nat_openai = bench("native openai", native("openai", openai_transport, api_base), args.chunks, args.runs)
+    lc_ollama = bench("langchain ollama", langchain_ollama, args.chunks, args.runs)
+    nat_ollama = bench("native ollama", native("ollama", ollama_transport, ollama_base), args.chunks, args.runs)
+
+    print(f"\nopenai speedup: {lc_openai / nat_openai:.1f}x, ollama speedup: {lc_ollama / nat_ollama:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
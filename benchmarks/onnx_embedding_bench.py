@@ -0,0 +1,139 @@
+"""
+Compare the inference backends of the embedding service (bot/test.py):
+PyTorch SentenceTransformer, ONNX fp32 and ONNX dynamic int8.
+
+Every backend runs in its own process, so the reported RSS is the cost of
+that backend alone. The accuracy check is the cosine similarity between each
+ONNX embedding and the PyTorch embedding of the same text.
+
+    python benchmarks/onnx_embedding_bench.py --model-path ./moka-ai_m3e-large --texts 512 --threads 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot")
+sys.path.insert(0, BOT_DIR)
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def make_texts(count: int) -> list:
+    words = "the quick brown fox jumps over a lazy dog while embeddings are computed on the cpu".split()
+    rng = np.random.default_rng(0)
+    return [" ".join(rng.choice(words, size=rng.integers(4, 48))) for _ in range(count)]
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def run_backend(args):
+    """Runs in the child process: load one backend, embed the texts and report."""
+    if args.backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(args.model_path, device="cpu")
+        if args.threads:
+            import torch
+
+            torch.set_num_threads(args.threads)
+    else:
+        from onnx_backend import OnnxEncoder, export_onnx
+
+        onnx_path = export_onnx(args.model_path, args.onnx_dir, quantize=args.backend == "onnx-int8")
+        model = OnnxEncoder(args.model_path, onnx_path, args.threads)
+
+    texts = make_texts(args.texts)
+    model.encode(texts[: args.batch_size], batch_size=args.batch_size)  # warm up
+
+    start = time.perf_counter()
+    embeddings = np.asarray(model.encode(texts, batch_size=args.batch_size), dtype=np.float32)
+    elapsed = time.perf_counter() - start
+
+    np.save(args.embeddings_out, embeddings)
+    print(
+        "BENCH_REPORT "
+        + json.dumps(
+            {
+                "backend": args.backend,
+                "texts_per_second": round(len(texts) / elapsed, 2),
+                "rss_mib": round(rss_bytes() / 1024 / 1024, 1),
+            }
+        )
+    )
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding inference backend benchmark")
+    parser.add_argument("--model-path", type=str, default="./moka-ai_m3e-large", help="SentenceTransformer model path")
+    parser.add_argument("--onnx-dir", type=str, default=None, help="Directory of the exported ONNX models")
+    parser.add_argument("--texts", type=int, default=512, help="Number of texts to embed")
+    parser.add_argument("--batch-size", type=int, default=32, help="Texts per inference call")
+    parser.add_argument("--threads", type=int, default=0, help="Inference threads, 0 for the runtime default")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Fail if an int8 embedding agrees less")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report to this file")
+    parser.add_argument("--backend", choices=BACKENDS, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--embeddings-out", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.onnx_dir = args.onnx_dir or f"{args.model_path.rstrip('/')}-onnx"
+
+    if args.backend:
+        run_backend(args)
+        return
+
+    reports = {}
+    embeddings = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for backend in BACKENDS:
+            out = os.path.join(tmp_dir, f"{backend}.npy")
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--backend", backend, "--embeddings-out", out],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"{backend} failed:\n{result.stderr}")
+            line = next(line for line in result.stdout.splitlines() if line.startswith("BENCH_REPORT "))
+            reports[backend] = json.loads(line[len("BENCH_REPORT "):])
+            embeddings[backend] = np.load(out)
+
+    for backend in BACKENDS[1:]:
+        similarity = cosine(embeddings["torch"], embeddings[backend])
+        reports[backend]["cosine_min"] = round(float(similarity.min()), 5)
+        reports[backend]["cosine_mean"] = round(float(similarity.mean()), 5)
+
+    print(f"{'backend':>10} | {'texts/s':>9} | {'rss MiB':>8} | {'cos min':>8} | {'cos mean':>8}")
+    for backend, report in reports.items():
+        print(
+            f"{backend:>10} | {report['texts_per_second']:>9} | {report['rss_mib']:>8} | "
+            f"{report.get('cosine_min', 1.0):>8} | {report.get('cosine_mean', 1.0):>8}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+
+    if reports["onnx-int8"]["cosine_min"] < args.min_cosine:
+        print(f"int8 cosine agreement below {args.min_cosine}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare preparing the messages of every turn of a long conversation by
+converting the whole window (the default) with the incremental
+ConversationStore (conversation_state_enabled).
+
+Reports the message objects allocated, the peak traced memory and the time
+per turn.
+
+    python benchmarks/prepare_messages_bench.py --turns 200 --history-length 20
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+
+import fastapi_poe as fp  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from conversation import ConversationStore  # noqa: E402
+
+
+class Converter:
+    """Converts Poe messages like LangChainBot and counts the created messages."""
+
+    def __init__(self):
+        self.created = 0
+
+    def __call__(self, message: fp.ProtocolMessage):
+        self.created += 1
+        if message.role == "user":
+            return HumanMessage(content=message.content)
+        return AIMessage(content=message.content)
+
+
+def make_message(index: int, size: int) -> fp.ProtocolMessage:
+    role = "user" if index % 2 == 0 else "bot"
+    return fp.ProtocolMessage(role=role, content=f"message {index} " + "x" * size, message_id=f"m{index}")
+
+
+def run(turns: int, history_length: int, size: int, incremental: bool):
+    converter = Converter()
+    store = ConversationStore() if incremental else None
+    query = []
+    elapsed = 0.0
+
+    tracemalloc.start()
+    for turn in range(turns):
+        # every turn adds the previous reply and a new user message, like poe sends it
+        if turn:
+            query.append(make_message(len(query), size))
+        query.append(make_message(len(query), size))
+        # a new request carries new message objects with the same ids and content
+        request_query = [message.model_copy() for message in query]
+        indices = range(max(len(request_query) - history_length, 0), len(request_query))
+
+        start = time.perf_counter()
+        if store is not None:
+            store.prepare("bench", request_query, indices, converter)
+        else:
+            [converter(request_query[i]) for i in indices]
+        elapsed += time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return converter.created, peak, elapsed / turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental message preparation benchmark")
+    parser.add_argument("--turns", type=int, default=200, help="Turns of the conversation")
+    parser.add_argument("--history-length", type=int, default=20, help="Messages per window")
+    parser.add_argument("--size", type=int, default=400, help="Characters per message")
+    args = parser.parse_args()
+
+    print(f"{'mode':>12} | {'messages created':>16} | {'peak KiB':>9} | {'us/turn':>8}")
+    for name, incremental in (("rebuild", False), ("incremental", True)):
+        created, peak, per_turn = run(args.turns, args.history_length, args.size, incremental)
+        print(f"{name:>12} | {created:>16} | {peak / 1024:>9.1f} | {per_turn * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from logger import get_logger
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is not admitted, either because the wait queue is
+    full or because it waited longer than the max queue wait
+    """
+
+    def __init__(self, limiter: str, reason: str):
+        super().__init__(f"{limiter}: {reason}")
+        self.limiter = limiter
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """
+    A concurrency limit with a bounded FIFO wait queue
+
+    Args:
+        name (str): The limiter name used in logs and stats
+        max_concurrency (int): Maximum number of admitted requests
+        max_queue (int): Maximum number of waiting requests
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int = 0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+
+        self.in_flight = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def acquire(self, timeout: Optional[float] = None):
+        """
+        Acquire a slot, waiting in the queue if the limit is reached
+
+        Args:
+            timeout (Optional[float]): Maximum seconds to wait in the queue
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait timed out
+        """
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(self.name, "queue full")
+
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # the slot is handed over by release(), in_flight is not decremented
+            await asyncio.wait_for(waiter, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over right as we gave up
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected_timeout += 1
+                raise AdmissionRejected(self.name, "queue wait timed out") from None
+            raise
+
+        wait_time = time.monotonic() - start
+        self.admitted += 1
+        self.wait_time_total += wait_time
+        self.wait_time_max = max(self.wait_time_max, wait_time)
+
+    def release(self):
+        """
+        Release a slot, handing it over to the oldest waiter if any
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "wait_time_avg": self.wait_time_total / self.admitted if self.admitted else 0.0,
+            "wait_time_max": self.wait_time_max,
+        }
+
+
+class AdmissionController:
+    """
+    Admits a request through a chain of limiters (e.g. per bot, then per
+    backend) under one shared queue wait deadline
+
+    Args:
+        limiters (List[ConcurrencyLimiter]): The limiters, acquired in order
+        max_queue_wait (float): Maximum seconds a request waits in total
+    """
+
+    def __init__(self, limiters: List[ConcurrencyLimiter], max_queue_wait: float = 10.0):
+        self.limiters = limiters
+        self.max_queue_wait = max_queue_wait
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Hold a slot of every limiter for the duration of the context
+
+        Raises:
+            AdmissionRejected: If any limiter rejects the request
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_queue_wait
+        acquired = []
+        try:
+            for limiter in self.limiters:
+                await limiter.acquire(max(deadline - loop.time(), 0))
+                acquired.append(limiter)
+            yield
+        finally:
+            for limiter in reversed(acquired):
+                limiter.release()
+
+    def stats(self) -> Dict:
+        return {limiter.name: limiter.stats() for limiter in self.limiters}
+
+
+class BackendLimiters:
+    """
+    Process-wide concurrency limiters keyed by the origin of ``api_base``,
+    shared by every bot pointing at the same backend
+
+    Args:
+        max_concurrency (Optional[int]): Maximum concurrent requests per backend, None to disable
+        max_queue (int): Maximum number of waiting requests per backend
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_queue: int = 100):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._limiters: Dict[str, ConcurrencyLimiter] = {}
+
+    def get_limiter(self, api_base: str) -> Optional[ConcurrencyLimiter]:
+        """
+        Get the limiter of the given backend
+
+        Args:
+            api_base (str): The backend API base URL
+
+        Returns:
+            Optional[ConcurrencyLimiter]: The limiter, None if backend limits are disabled
+        """
+        if not self.max_concurrency:
+            return None
+        parts = urlsplit(api_base)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        limiter = self._limiters.get(origin)
+        if limiter is None:
+            get_logger("BackendLimiters").info(
+                f"Limiting backend {origin} to {self.max_concurrency} concurrent requests"
+            )
+            limiter = ConcurrencyLimiter(
+                f"backend:{origin}", self.max_concurrency, self.max_queue
+            )
+            self._limiters[origin] = limiter
+        return limiter
+
+    def stats(self) -> Dict:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+
+# global backend limiters
+backend_limiters: Optional[BackendLimiters] = None
+
+
+def get_backend_limiters() -> BackendLimiters:
+    global backend_limiters
+    if backend_limiters is None:
+        backend_limiters = BackendLimiters()
+    return backend_limiters
+
+
+def set_backend_limiters(limiters: BackendLimiters):
+    global backend_limiters
+    backend_limiters = limiters
@@ -1,26 +1,61 @@
 import logging
-from logger import LoggerManager, FastAPILogMiddleware, set_logger_manager, get_logger_manager, log_method
-from configs import AppConfig, get_logger_manager_from_config
-from models import BotFactory
+from logger import LoggerManager, AccessLogMiddleware, set_logger_manager, get_logger_manager, log_method
+from configs import (
+    AppConfig,
+    get_logger_manager_from_config,
+    get_http_client_pool_from_config,
+    get_backend_limiters_from_config,
+)
+from http_pool import set_http_client_pool, get_http_client_pool
+from admission import set_backend_limiters, get_backend_limiters
+from metrics import get_metrics_registry
+from reload import ConfigReloader
+from models import BotFactory, backend_import_times
+from poe_app import make_bots_app, sync_settings
+from startup import StartupTimer
 
 import argparse
+import asyncio
+import os
+import time
+from typing import Optional
 
 from fastapi import FastAPI
-import fastapi_poe as fp
+from fastapi.responses import PlainTextResponse
 
 
-def main(app_config: AppConfig) -> FastAPI:
+def main(app_config: AppConfig, timer: Optional[StartupTimer] = None) -> FastAPI:
 
     logger = get_logger_manager().get_logger("main")
-    
+    timer = timer or StartupTimer()
 
-    bots = []
+    bots = {}
     for bot_config in app_config.bot_configs:
         logger.info(f"Creating bot for {bot_config.bot_name}")
+        imported = set(backend_import_times)
+        start = time.perf_counter()
         bot = BotFactory.create_bot(bot_config.to_bot_config())
-        bots.append(bot)
-        
-    main_app = fp.make_app(bots)
+        elapsed = time.perf_counter() - start
+        # the first bot of a type pays for its backend import, report it apart
+        for module_name in backend_import_times.keys() - imported:
+            timer.record(f"import:{module_name}", backend_import_times[module_name])
+            elapsed -= backend_import_times[module_name]
+        timer.record(f"bot:{bot_config.bot_name}", elapsed)
+        bots[bot.path] = bot
+
+    with timer.phase("app"):
+        main_app = make_bots_app(list(bots.values()))
+    # bots by path, replaced as a whole on config reload
+    main_app.state.bots = bots
+    main_app.state.startup = timer
+
+    async def start_settings_sync():
+        # in the background, a slow Poe API must not delay serving
+        main_app.state.settings_sync = asyncio.get_running_loop().create_task(
+            sync_settings(list(bots.values()))
+        )
+
+    main_app.add_event_handler("startup", start_settings_sync)
     
     
     @main_app.get("/")
@@ -31,10 +66,90 @@ def main(app_config: AppConfig) -> FastAPI:
     def health():
         return {"status": "ok"}
 
+    @main_app.get("/metrics")
+    def metrics():
+        return PlainTextResponse(
+            get_metrics_registry().render(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    @main_app.get("/stats")
+    def stats():
+        return {
+            "logging": get_logger_manager().stats(),
+            "http_pool": get_http_client_pool().stats(),
+            "backends": get_backend_limiters().stats(),
+            "bots": {bot.bot_name: bot.get_stats() for bot in main_app.state.bots.values()},
+            "startup": main_app.state.startup.to_dict(),
+        }
+
         
     return main_app
 
 
+# env var used to pass the config path to the worker processes
+CONFIG_PATH_ENV = "POE_BOTS_CONFIG"
+
+
+def create_app(timer: Optional[StartupTimer] = None) -> FastAPI:
+    """
+    App factory for uvicorn, called once in every worker process.
+
+    Every worker loads the config and builds its own bots through BotFactory,
+    the listen socket is bound once by uvicorn and shared by all workers.
+
+    Args:
+    timer (Optional[StartupTimer]): Timer with the phases measured before the
+        factory, e.g. the import of this module by benchmarks/cold_start.py
+    """
+    timer = timer or StartupTimer()
+
+    config_path = os.environ.get(CONFIG_PATH_ENV, "./configs/config.toml")
+    with timer.phase("config"):
+        app_config = AppConfig.load_config(config_path)
+
+    with timer.phase("setup"):
+        logger_manager = get_logger_manager_from_config(app_config)
+        set_logger_manager(logger_manager)
+        set_http_client_pool(get_http_client_pool_from_config(app_config))
+        set_backend_limiters(get_backend_limiters_from_config(app_config))
+
+    main_app = main(app_config, timer)
+    main_app.add_middleware(
+        AccessLogMiddleware,
+        logger_manager=logger_manager,
+        sample_rate=app_config.access_log_sample_rate,
+    )
+
+    if app_config.reload_watch:
+        reloader = ConfigReloader(main_app, config_path, app_config, app_config.reload_interval)
+        main_app.add_event_handler("startup", reloader.start)
+
+    logger = get_logger_manager().get_logger("main")
+    logger.info(
+        f"Worker {os.getpid()} started with {len(app_config.bot_configs)} bots "
+        f"in {timer.total * 1000:.1f}ms"
+    )
+    logger.info(timer.report())
+
+    return main_app
+
+
+def get_uvicorn_log_level(level: str) -> int:
+    if level == "DEBUG":
+        return logging.DEBUG
+    elif level == "INFO":
+        return logging.INFO
+    elif level == "WARNING":
+        return logging.WARNING
+    elif level == "ERROR":
+        return logging.ERROR
+    elif level == "CRITICAL":
+        return logging.CRITICAL
+    else:
+        return logging.INFO
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Server mutlitple Poe server bots with different models")
     parser.add_argument("-c","--config", type=str, default="./configs/config.toml", help="Path to the configuration file")
@@ -44,35 +159,25 @@ if __name__ == "__main__":
     args = parser.parse_args()
     
     app_config = AppConfig.load_config(args.config)
-    
-    main_app = main(app_config)
+    os.environ[CONFIG_PATH_ENV] = os.path.abspath(args.config)
     
     logger_manager = get_logger_manager_from_config(app_config)
     set_logger_manager(logger_manager)
     
     logger = get_logger_manager().get_logger("main")
     
-    logger.info(f"Starting server on {app_config.listen_host}:{app_config.listen_port}")
-    
-    main_app.add_middleware(FastAPILogMiddleware, logger_manager=logger_manager)
+    logger.info(
+        f"Starting server on {app_config.listen_host}:{app_config.listen_port} with {app_config.workers} workers"
+    )
     
     import uvicorn
     
-    log_level = logging.INFO
-    
-    if app_config.console_log_level == "DEBUG":
-        log_level = logging.DEBUG
-    elif app_config.console_log_level == "INFO":
-        log_level = logging.INFO
-    elif app_config.console_log_level == "WARNING":
-        log_level = logging.WARNING
-    elif app_config.console_log_level == "ERROR":
-        log_level = logging.ERROR
-    elif app_config.console_log_level == "CRITICAL":
-        log_level = logging.CRITICAL
-    else:
-        log_level = logging.INFO
-    
-    uvicorn.run(main_app, host=app_config.listen_host, port=app_config.listen_port, log_level=log_level)
-    
-    
\ No newline at end of file
+    uvicorn.run(
+        "bot:create_app",
+        factory=True,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=app_config.listen_host,
+        port=app_config.listen_port,
+        workers=app_config.workers,
+        log_level=get_uvicorn_log_level(app_config.console_log_level),
+    )
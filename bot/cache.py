@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from logger import get_logger
+
+
+class ResponseCache:
+    """
+    A response cache for bot answers, keyed on the prepared prompt and the
+    generation parameters.
+
+    The first tier is an in-memory LRU bounded both by entry count and by the
+    total size of the cached text. The optional second tier stores entries as
+    JSON files under ``cache_dir`` so that they survive restarts.
+
+    Args:
+        ttl (int): Time to live of an entry in seconds
+        max_entries (int): Maximum number of entries kept in memory
+        max_bytes (int): Maximum total size of the cached text kept in memory
+        cache_dir (Optional[str]): Directory of the on-disk tier, disabled if empty
+    """
+
+    def __init__(
+        self,
+        ttl: int = 3600,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        cache_dir: Optional[str] = None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.logger = get_logger("ResponseCache")
+
+        # key -> (expires_at, chunks, size)
+        self._entries: "OrderedDict[str, tuple[float, List[str], int]]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(messages: List[tuple[str, str]], params: Dict) -> str:
+        """
+        Build a cache key from the prepared messages and the generation params
+
+        Args:
+            messages (List[tuple[str, str]]): (role, content) pairs of the prompt
+            params (Dict): The generation parameters
+
+        Returns:
+            str: The hex digest used as cache key
+        """
+        payload = json.dumps(
+            {"messages": messages, "params": params},
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[List[str]]:
+        """
+        Get the cached chunks for the given key
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            Optional[List[str]]: The cached chunks, None on a miss
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, chunks, _ = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return chunks
+            self._remove(key)
+
+        if self.cache_dir:
+            chunks = await asyncio.to_thread(self._read_disk, key)
+            if chunks is not None:
+                self._store(key, chunks)
+                self.disk_hits += 1
+                return chunks
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, chunks: List[str]):
+        """
+        Store the chunks of a complete response
+
+        Args:
+            key (str): The cache key
+            chunks (List[str]): The response chunks in order
+        """
+        self._store(key, chunks)
+        if self.cache_dir:
+            await asyncio.to_thread(self._write_disk, key, chunks)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _store(self, key: str, chunks: List[str]):
+        size = sum(len(chunk.encode("utf-8")) for chunk in chunks)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, chunks, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[List[str]]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Failed to read cache entry {path}: {e}")
+            return None
+
+        if data.get("created", 0) + self.ttl < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return data.get("chunks")
+
+    def _write_disk(self, key: str, chunks: List[str]):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "chunks": chunks}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"Failed to write cache entry {path}: {e}")
@@ -1,5 +1,7 @@
-from models import BaseBotConfig, BotType
+from models import BaseBotConfig, BotType, EndpointConfig
 from logger import LoggerManager
+from http_pool import HttpClientPool
+from admission import BackendLimiters
 
 
 import os
@@ -16,12 +18,27 @@ class BotConfig(BaseModel):
     model: str = Field(..., description="AI model name")  # AI model name
     api_base: Optional[str] = Field(None, description="API base URL")  # API base URL
     api_key: Optional[str] = Field(None, description="API key")  # API key
+    endpoints: List[EndpointConfig] = Field(
+        default_factory=list, description="Endpoints to route between, overrides api_base/api_key"
+    )  # Endpoints to route between, overrides api_base/api_key
+    endpoint_max_failures: int = Field(
+        default=3, description="Consecutive failures before an endpoint is ejected"
+    )  # Consecutive failures before an endpoint is ejected
+    endpoint_eject_seconds: float = Field(
+        default=30.0, description="Seconds before an ejected endpoint is probed again"
+    )  # Seconds before an ejected endpoint is probed again
+    hedge_after: Optional[float] = Field(
+        default=None, description="Seconds without a first chunk before a hedged request is sent"
+    )  # Seconds without a first chunk before a hedged request is sent
     poe_key: Optional[str] = Field(None, description="POE key")  # POE key
     bot_type: str = Field(default="openai", description="Bot type")  # Bot type
     bot_name: Optional[str] = Field(None, description="Bot name")  # Bot name
     history_length: int = Field(
         10, description="Number of messages to keep in history"
     )  # Number of messages to keep in history
+    max_prompt_tokens: Optional[int] = Field(
+        None, description="Trim history to this token budget instead of history_length"
+    )  # Trim history to this token budget instead of history_length
     sub_url: Optional[str] = Field(
         default="/bot", description="Sub URL for this bot"
     )  # Sub URL for this bot
@@ -31,6 +48,102 @@ class BotConfig(BaseModel):
     num_predict: int = Field(
         default=2048, description="Number of tokens to predict"
     )  # Number of tokens to predict
+    cache_enabled: bool = Field(
+        default=False, description="Enable the response cache"
+    )  # Enable the response cache
+    cache_ttl: int = Field(
+        default=3600, description="Time to live of a cached response in seconds"
+    )  # Time to live of a cached response in seconds
+    cache_max_entries: int = Field(
+        default=1024, description="Maximum number of responses cached in memory"
+    )  # Maximum number of responses cached in memory
+    cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024, description="Maximum size of responses cached in memory"
+    )  # Maximum size of responses cached in memory
+    cache_dir: Optional[str] = Field(
+        default=None, description="Directory of the on-disk cache, disabled if empty"
+    )  # Directory of the on-disk cache, disabled if empty
+    cache_max_temperature: Optional[float] = Field(
+        default=None, description="Disable the response and semantic caches when temperature is above this value"
+    )  # Disable the response and semantic caches when temperature is above this value
+    coalesce_window_ms: int = Field(
+        default=0, description="Coalesce stream chunks within this window in ms, 0 to disable"
+    )  # Coalesce stream chunks within this window in ms, 0 to disable
+    coalesce_max_bytes: int = Field(
+        default=512, description="Flush coalesced chunks once they reach this size in bytes"
+    )  # Flush coalesced chunks once they reach this size in bytes
+    max_concurrency: Optional[int] = Field(
+        default=None, description="Maximum concurrent upstream requests of this bot"
+    )  # Maximum concurrent upstream requests of this bot
+    max_queue: int = Field(
+        default=100, description="Maximum number of requests waiting for a slot"
+    )  # Maximum number of requests waiting for a slot
+    max_queue_wait: float = Field(
+        default=10.0, description="Maximum seconds a request waits for a slot"
+    )  # Maximum seconds a request waits for a slot
+    singleflight_enabled: bool = Field(
+        default=False, description="Share one upstream stream between identical concurrent requests"
+    )  # Share one upstream stream between identical concurrent requests
+    semantic_cache_enabled: bool = Field(
+        default=False, description="Reuse responses of single turn questions with a similar meaning"
+    )  # Reuse responses of single turn questions with a similar meaning
+    semantic_cache_api_base: str = Field(
+        default="http://localhost:6008/v1", description="Embeddings API base URL of the semantic cache"
+    )  # Embeddings API base URL of the semantic cache
+    semantic_cache_api_key: str = Field(
+        default="", description="Embeddings API key of the semantic cache"
+    )  # Embeddings API key of the semantic cache
+    semantic_cache_model: str = Field(
+        default="m3e", description="Embedding model of the semantic cache"
+    )  # Embedding model of the semantic cache
+    semantic_cache_threshold: float = Field(
+        default=0.92, description="Minimum cosine similarity of a semantic cache hit"
+    )  # Minimum cosine similarity of a semantic cache hit
+    semantic_cache_max_entries: int = Field(
+        default=4096, description="Maximum number of responses in the semantic cache"
+    )  # Maximum number of responses in the semantic cache
+    semantic_cache_timeout: float = Field(
+        default=1.0, description="Seconds an embedding call may take before the semantic cache is skipped"
+    )  # Seconds an embedding call may take before the semantic cache is skipped
+    conversation_state_enabled: bool = Field(
+        default=False, description="Keep the prepared messages per conversation and convert only new ones"
+    )  # Keep the prepared messages per conversation and convert only new ones
+    conversation_state_max_entries: int = Field(
+        default=1024, description="Maximum number of conversations kept"
+    )  # Maximum number of conversations kept
+    conversation_state_ttl: float = Field(
+        default=3600, description="Seconds an unused conversation is kept"
+    )  # Seconds an unused conversation is kept
+    conversation_state_max_bytes: int = Field(
+        default=32 * 1024 * 1024, description="Maximum size of the kept messages in bytes"
+    )  # Maximum size of the kept messages in bytes
+    summary_enabled: bool = Field(
+        default=False, description="Fold old turns into a running summary generated in the background"
+    )  # Fold old turns into a running summary generated in the background
+    summary_model: Optional[str] = Field(
+        default=None, description="Model writing the summaries, the bot model if not set"
+    )  # Model writing the summaries, the bot model if not set
+    summary_api_base: Optional[str] = Field(
+        default=None, description="API base URL of the summary model, the first endpoint if not set"
+    )  # API base URL of the summary model, the first endpoint if not set
+    summary_api_key: Optional[str] = Field(
+        default=None, description="API key of the summary model, the first endpoint key if not set"
+    )  # API key of the summary model, the first endpoint key if not set
+    summary_after: int = Field(
+        default=4, description="Number of messages not covered by the summary starting a new summary"
+    )  # Number of messages not covered by the summary starting a new summary
+    summary_keep: int = Field(
+        default=4, description="Number of newest messages never summarized, summary_after + summary_keep <= history_length"
+    )  # Number of newest messages never summarized, summary_after + summary_keep <= history_length
+    summary_max_tokens: int = Field(
+        default=512, description="Maximum number of tokens of a summary"
+    )  # Maximum number of tokens of a summary
+    summary_max_entries: int = Field(
+        default=1024, description="Maximum number of conversation summaries kept"
+    )  # Maximum number of conversation summaries kept
+    summary_ttl: float = Field(
+        default=3600, description="Seconds an unused conversation summary is kept"
+    )  # Seconds an unused conversation summary is kept
     
     
     def to_bot_config(self) -> BaseBotConfig:
@@ -44,6 +157,10 @@ class BotConfig(BaseModel):
             model_type = BotType.OPENAI
         elif self.bot_type == "ollama":
             model_type = BotType.OLLAMA
+        elif self.bot_type == "openai_native":
+            model_type = BotType.OPENAI_NATIVE
+        elif self.bot_type == "ollama_native":
+            model_type = BotType.OLLAMA_NATIVE
         else:
             raise ValueError(f"Invalid bot type: {self.bot_type}")
 
@@ -53,12 +170,49 @@ class BotConfig(BaseModel):
             bot_type=model_type,
             api_base=self.api_base,
             api_key=self.api_key,
+            endpoints=self.endpoints,
+            endpoint_max_failures=self.endpoint_max_failures,
+            endpoint_eject_seconds=self.endpoint_eject_seconds,
+            hedge_after=self.hedge_after,
             history_length=self.history_length,
+            max_prompt_tokens=self.max_prompt_tokens,
             poe_key=self.poe_key,
             bot_name=self.bot_name,
             temperature=self.temperature,
             num_predict=self.num_predict,
             sub_url=self.sub_url,
+            cache_enabled=self.cache_enabled,
+            cache_ttl=self.cache_ttl,
+            cache_max_entries=self.cache_max_entries,
+            cache_max_bytes=self.cache_max_bytes,
+            cache_dir=self.cache_dir,
+            cache_max_temperature=self.cache_max_temperature,
+            coalesce_window_ms=self.coalesce_window_ms,
+            coalesce_max_bytes=self.coalesce_max_bytes,
+            max_concurrency=self.max_concurrency,
+            max_queue=self.max_queue,
+            max_queue_wait=self.max_queue_wait,
+            singleflight_enabled=self.singleflight_enabled,
+            semantic_cache_enabled=self.semantic_cache_enabled,
+            semantic_cache_api_base=self.semantic_cache_api_base,
+            semantic_cache_api_key=self.semantic_cache_api_key,
+            semantic_cache_model=self.semantic_cache_model,
+            semantic_cache_threshold=self.semantic_cache_threshold,
+            semantic_cache_max_entries=self.semantic_cache_max_entries,
+            semantic_cache_timeout=self.semantic_cache_timeout,
+            conversation_state_enabled=self.conversation_state_enabled,
+            conversation_state_max_entries=self.conversation_state_max_entries,
+            conversation_state_ttl=self.conversation_state_ttl,
+            conversation_state_max_bytes=self.conversation_state_max_bytes,
+            summary_enabled=self.summary_enabled,
+            summary_model=self.summary_model,
+            summary_api_base=self.summary_api_base,
+            summary_api_key=self.summary_api_key,
+            summary_after=self.summary_after,
+            summary_keep=self.summary_keep,
+            summary_max_tokens=self.summary_max_tokens,
+            summary_max_entries=self.summary_max_entries,
+            summary_ttl=self.summary_ttl,
         )
 
 
@@ -73,6 +227,9 @@ class AppConfig(BaseModel):
     listen_port: int = Field(
         default=51245, description="Port to listen on"
     )  # Port to listen on
+    workers: int = Field(
+        default=1, description="Number of worker processes"
+    )  # Number of worker processes
     log_level: Optional[str] = Field(
         default="INFO", description="Log level for the application"
     )  # Log level for the application
@@ -85,6 +242,60 @@ class AppConfig(BaseModel):
     log_file_path: Optional[str] = Field(
         default="./logs/app.log", description="Path to the log file"
     )  # Path to the log file
+    access_log_sample_rate: float = Field(
+        default=1.0, description="Fraction of requests written to the access log"
+    )  # Fraction of requests written to the access log
+    log_async: bool = Field(
+        default=False, description="Write logs from a background thread through a bounded queue"
+    )  # Write logs from a background thread through a bounded queue
+    log_queue_size: int = Field(
+        default=10000, description="Maximum number of queued log records in async mode"
+    )  # Maximum number of queued log records in async mode
+    log_overflow_policy: str = Field(
+        default="drop_newest", description="drop_newest, drop_oldest or block when the log queue is full"
+    )  # drop_newest, drop_oldest or block when the log queue is full
+    log_batch_size: int = Field(
+        default=256, description="Maximum number of log records written per batch"
+    )  # Maximum number of log records written per batch
+    log_rotate_max_bytes: int = Field(
+        default=0, description="Rotate the log file at this size, 0 to disable"
+    )  # Rotate the log file at this size, 0 to disable
+    log_rotate_interval: float = Field(
+        default=0, description="Rotate the log file every interval seconds, 0 to disable"
+    )  # Rotate the log file every interval seconds, 0 to disable
+    log_rotate_backup_count: int = Field(
+        default=5, description="Number of rotated log files to keep"
+    )  # Number of rotated log files to keep
+    http_max_connections: int = Field(
+        default=100, description="Maximum number of connections per upstream"
+    )  # Maximum number of connections per upstream
+    http_max_keepalive_connections: int = Field(
+        default=20, description="Maximum number of idle keep-alive connections per upstream"
+    )  # Maximum number of idle keep-alive connections per upstream
+    http_keepalive_expiry: float = Field(
+        default=30.0, description="Seconds an idle upstream connection is kept alive"
+    )  # Seconds an idle upstream connection is kept alive
+    http2: bool = Field(
+        default=False, description="Use HTTP/2 for upstream connections (requires h2)"
+    )  # Use HTTP/2 for upstream connections (requires h2)
+    http_connect_timeout: float = Field(
+        default=10.0, description="Upstream connect timeout in seconds"
+    )  # Upstream connect timeout in seconds
+    http_read_timeout: float = Field(
+        default=600.0, description="Upstream read timeout in seconds"
+    )  # Upstream read timeout in seconds
+    backend_max_concurrency: Optional[int] = Field(
+        default=None, description="Maximum concurrent requests per api_base"
+    )  # Maximum concurrent requests per api_base
+    backend_max_queue: int = Field(
+        default=100, description="Maximum number of requests waiting per api_base"
+    )  # Maximum number of requests waiting per api_base
+    reload_watch: bool = Field(
+        default=False, description="Reload changed bots when the config file changes or on SIGHUP"
+    )  # Reload changed bots when the config file changes or on SIGHUP
+    reload_interval: float = Field(
+        default=2.0, description="Seconds between config file checks"
+    )  # Seconds between config file checks
     bot_configs: List[BotConfig] = Field(
         default_factory=list, description="List of bot configurations"
     )  # List of bot configurations
@@ -142,4 +353,29 @@ def get_logger_manager_from_config(config: AppConfig):
         console_level=config.console_log_level,
         file_level=config.file_log_level,
         log_file=config.log_file_path,
-    )
\ No newline at end of file
+        async_mode=config.log_async,
+        queue_size=config.log_queue_size,
+        overflow_policy=config.log_overflow_policy,
+        batch_size=config.log_batch_size,
+        rotate_max_bytes=config.log_rotate_max_bytes,
+        rotate_interval=config.log_rotate_interval,
+        rotate_backup_count=config.log_rotate_backup_count,
+    )
+
+
+def get_http_client_pool_from_config(config: AppConfig):
+    return HttpClientPool(
+        max_connections=config.http_max_connections,
+        max_keepalive_connections=config.http_max_keepalive_connections,
+        keepalive_expiry=config.http_keepalive_expiry,
+        http2=config.http2,
+        connect_timeout=config.http_connect_timeout,
+        read_timeout=config.http_read_timeout,
+    )
+
+
+def get_backend_limiters_from_config(config: AppConfig):
+    return BackendLimiters(
+        max_concurrency=config.backend_max_concurrency,
+        max_queue=config.backend_max_queue,
+    )
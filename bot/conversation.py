@@ -0,0 +1,172 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import fastapi_poe as fp
+
+# rough per message overhead of a converted message and its bookkeeping, in bytes
+MESSAGE_OVERHEAD = 256
+
+# marks a position whose message has not been converted (or was released)
+_MISSING = object()
+
+
+def message_identity(message: fp.ProtocolMessage):
+    # poe sends a message id for every message, fall back to the content without one
+    return message.message_id or (message.role, message.content)
+
+
+class ConversationState:
+    """
+    The prepared messages of one conversation, aligned with the positions of
+    ``request.query``
+    """
+
+    __slots__ = ("ids", "converted", "bytes", "last_used")
+
+    def __init__(self):
+        self.ids: List[Any] = []
+        self.converted: List[Any] = []
+        self.bytes = 0
+        self.last_used = 0.0
+
+    def truncate(self, length: int):
+        for message in self.converted[length:]:
+            if message is not _MISSING and message is not None:
+                self.bytes -= len(message.content) + MESSAGE_OVERHEAD
+        del self.ids[length:]
+        del self.converted[length:]
+
+
+class ConversationStore:
+    """
+    Keeps the converted messages of recent conversations, so every turn only
+    converts the messages that are new since the previous turn instead of
+    rebuilding the whole window.
+
+    The stored history is checked against the request by message id. When it
+    diverges (a regenerated or edited message), the state is cut back to the
+    common prefix and rebuilt from there. Messages before the oldest position
+    of the current window are released.
+
+    Conversations are evicted when unused for ``ttl`` seconds, and least
+    recently used first when there are more than ``max_entries`` of them or
+    their messages take more than ``max_bytes``.
+
+    Args:
+        max_entries (int): Maximum number of conversations
+        ttl (float): Seconds an unused conversation is kept
+        max_bytes (int): Maximum estimated size of all stored messages
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._states: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.diverged = 0
+        self.converted = 0
+        self.reused = 0
+        self.evictions = 0
+
+    def prepare(
+        self,
+        conversation_id: str,
+        query: List[fp.ProtocolMessage],
+        indices: Iterable[int],
+        convert: Callable[[fp.ProtocolMessage], Optional[Any]],
+    ) -> List[Any]:
+        """
+        Get the converted messages at the given positions of the query,
+        converting only the ones not converted in a previous turn
+
+        Args:
+            conversation_id (str): The conversation id of the request
+            query (List[fp.ProtocolMessage]): The full history of the request
+            indices (Iterable[int]): The positions of the window, in order
+            convert (Callable): Converts a Poe message, None drops the message
+
+        Returns:
+            The converted messages of the window, dropped messages excluded
+        """
+        now = time.monotonic()
+        state = self._states.get(conversation_id)
+        if state is None:
+            state = ConversationState()
+            self._states[conversation_id] = state
+            self.misses += 1
+        else:
+            self._states.move_to_end(conversation_id)
+            self.hits += 1
+        state.last_used = now
+        before = state.bytes
+
+        # keep the common prefix, drop everything after a divergence
+        common = 0
+        for stored, message in zip(state.ids, query):
+            if stored != message_identity(message):
+                break
+            common += 1
+        if common < len(state.ids):
+            self.diverged += 1
+            state.truncate(common)
+        for message in query[common:]:
+            state.ids.append(message_identity(message))
+            state.converted.append(_MISSING)
+
+        indices = list(indices)
+        # release the messages older than the window
+        oldest = indices[0] if indices else len(query)
+        for i in range(oldest):
+            message = state.converted[i]
+            if message is not _MISSING:
+                if message is not None:
+                    state.bytes -= len(message.content) + MESSAGE_OVERHEAD
+                state.converted[i] = _MISSING
+
+        messages = []
+        for i in indices:
+            message = state.converted[i]
+            if message is _MISSING:
+                message = convert(query[i])
+                state.converted[i] = message
+                self.converted += 1
+                if message is not None:
+                    state.bytes += len(message.content) + MESSAGE_OVERHEAD
+            else:
+                self.reused += 1
+            if message is not None:
+                messages.append(message)
+
+        self._bytes += state.bytes - before
+        self._evict(now)
+        return messages
+
+    def _evict(self, now: float):
+        while self._states:
+            conversation_id, state = next(iter(self._states.items()))
+            if (
+                now - state.last_used <= self.ttl
+                and len(self._states) <= self.max_entries
+                and self._bytes <= self.max_bytes
+            ):
+                break
+            del self._states[conversation_id]
+            self._bytes -= state.bytes
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        return {
+            "conversations": len(self._states),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "diverged": self.diverged,
+            "converted": self.converted,
+            "reused": self.reused,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,218 @@
+"""
+嵌入服务的内容寻址缓存: 内存 LRU + 只追加的内存映射 float32 向量文件
+(Content addressed cache of the embedding service: an in-memory LRU in front
+of an append-only, memory-mapped float32 vector store)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+KEY_SIZE = 16
+
+
+def embedding_key(model: str, text: str) -> bytes:
+    """
+    文本和模型名的哈希 (Hash of the model name and the text)
+
+    Args:
+        model (str): The model name
+        text (str): The text
+
+    Returns:
+        bytes: The 16 byte key
+    """
+    return hashlib.blake2b(f"{model}\0{text}".encode("utf-8"), digest_size=KEY_SIZE).digest()
+
+
+class EmbeddingStore:
+    """
+    只追加的向量存储, 重启后通过内存映射读取, 不需要把所有向量加载到内存
+    (Append-only vector store, read through a memory map after a restart
+    without loading every vector into RAM)
+
+    Files in ``path``:
+        meta.json    the vector size
+        vectors.f32  the float32 vectors, one row per entry
+        keys.bin     the 16 byte key of every row, in the same order
+
+    Vectors are written before their keys, so a crash can only leave
+    vectors without a key, which are dropped on the next start.
+
+    Args:
+        path (str): The store directory
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.meta_path = os.path.join(path, "meta.json")
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.keys_path = os.path.join(path, "keys.bin")
+
+        self.dim: Optional[int] = None
+        self.rows: Dict[bytes, int] = {}
+        self._lock = threading.Lock()
+        self._map: Optional[np.memmap] = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.meta_path):
+            return
+        with open(self.meta_path) as f:
+            self.dim = json.load(f)["dim"]
+
+        keys = b""
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "rb") as f:
+                keys = f.read()
+        vector_rows = os.path.getsize(self.vectors_path) // (self.dim * 4) if os.path.exists(self.vectors_path) else 0
+        count = min(len(keys) // KEY_SIZE, vector_rows)
+
+        # drop partial writes of a crash
+        with open(self.keys_path, "ab") as f:
+            f.truncate(count * KEY_SIZE)
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(count * self.dim * 4)
+
+        self.rows = {keys[i * KEY_SIZE : (i + 1) * KEY_SIZE]: i for i in range(count)}
+
+    def _vectors(self) -> Optional[np.memmap]:
+        # remap after appends, the map only covers the rows present when it was created
+        if self._map is None or len(self._map) < len(self.rows):
+            self._map = (
+                np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self.rows), self.dim))
+                if self.rows
+                else None
+            )
+        return self._map
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return np.array(self._vectors()[row])
+
+    def append(self, keys: List[bytes], vectors: np.ndarray):
+        """
+        追加向量, 已存在的 key 会被跳过 (Append vectors, existing keys are skipped)
+
+        Args:
+            keys (List[bytes]): The keys
+            vectors (np.ndarray): The vectors, one row per key
+        """
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with open(self.meta_path, "w") as f:
+                    json.dump({"dim": self.dim}, f)
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Vector size {vectors.shape[1]} does not match the store size {self.dim}")
+
+            new = [i for i, key in enumerate(keys) if key not in self.rows]
+            # the same text twice in one batch
+            new = list({keys[i]: i for i in new}.values())
+            if not new:
+                return
+
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors[new], dtype=np.float32).tobytes())
+                f.flush()
+            with open(self.keys_path, "ab") as f:
+                f.write(b"".join(keys[i] for i in new))
+                f.flush()
+            start = len(self.rows)
+            for offset, i in enumerate(new):
+                self.rows[keys[i]] = start + offset
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "rows": len(self.rows),
+            "dim": self.dim,
+            "bytes": len(self.rows) * (self.dim or 0) * 4,
+        }
+
+
+class EmbeddingCache:
+    """
+    内存 LRU 在前, 向量存储在后, 只有未命中的文本需要模型计算
+    (In-memory LRU in front of the vector store, only misses go to the model)
+
+    Args:
+        store (EmbeddingStore): The persistent vector store
+        max_entries (int): Maximum number of vectors in the memory LRU
+    """
+
+    def __init__(self, store: EmbeddingStore, max_entries: int = 10000):
+        self.store = store
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        """
+        查找向量 (Look up the vectors of the given keys)
+
+        Args:
+            keys (List[bytes]): The keys
+
+        Returns:
+            The vector of every key, None for misses
+        """
+        vectors = []
+        for key in keys:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            else:
+                vector = self.store.get(key)
+                if vector is not None:
+                    self._remember(key, vector)
+                    self.store_hits += 1
+                else:
+                    self.misses += 1
+            vectors.append(vector)
+        return vectors
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray):
+        """
+        把新计算的向量放入内存 LRU, 与 get_many 在同一线程调用; 持久化用
+        store.append, 可以放到其他线程
+        (Put newly computed vectors in the memory LRU, call it on the same
+        thread as get_many; persist them with store.append, which may run on
+        another thread)
+
+        Args:
+            keys (List[bytes]): The keys
+            vectors (np.ndarray): The vectors, one row per key
+        """
+        for key, vector in zip(keys, vectors):
+            self._remember(key, vector)
+
+    def stats(self) -> Dict:
+        lookups = self.memory_hits + self.store_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.store_hits) / lookups, 4) if lookups else None,
+            "store": self.store.stats(),
+        }
@@ -0,0 +1,118 @@
+import base64
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+
+
+def expand_features(embedding, target_length):
+    """
+    特征扩展的参考实现, 对单个向量做二阶多项式扩展后截断或填充到 target_length
+    (Reference implementation: degree-2 PolynomialFeatures of one vector,
+    truncated or zero padded to target_length)
+    """
+    from sklearn.preprocessing import PolynomialFeatures
+
+    poly = PolynomialFeatures(degree=2)
+    expanded_embedding = poly.fit_transform(embedding.reshape(1, -1))
+    expanded_embedding = expanded_embedding.flatten()
+    if len(expanded_embedding) > target_length:
+        # 如果扩展后的特征超过目标长度，可以通过截断或其他方法来减少维度
+        expanded_embedding = expanded_embedding[:target_length]
+    elif len(expanded_embedding) < target_length:
+        # 如果扩展后的特征少于目标长度，可以通过填充或其他方法来增加维度
+        expanded_embedding = np.pad(
+            expanded_embedding, (0, target_length - len(expanded_embedding))
+        )
+    return expanded_embedding
+
+
+@lru_cache(maxsize=16)
+def quadratic_indices(dim: int, target_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    截断后保留的二阶项的列下标, 顺序与 PolynomialFeatures 相同
+    (Column pairs of the degree-2 terms kept after truncating to
+    target_length, in PolynomialFeatures order: x0*x0, x0*x1, ..., x1*x1, ...)
+
+    Args:
+        dim (int): The embedding size
+        target_length (int): The expanded size
+
+    Returns:
+        The left and right column indices of every kept term
+    """
+    count = max(0, min(target_length - 1 - dim, dim * (dim + 1) // 2))
+    left, right = [], []
+    i = 0
+    while count > 0:
+        take = min(dim - i, count)
+        left.append(np.full(take, i))
+        right.append(np.arange(i, i + take))
+        count -= take
+        i += 1
+    if not left:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate(left), np.concatenate(right)
+
+
+def expand_features_batch(embeddings: np.ndarray, target_length: int) -> np.ndarray:
+    """
+    批量特征扩展, 只计算截断后需要的列, 结果与 expand_features 逐行相同
+    (Batched expand_features over an (n, d) matrix, only the target_length
+    kept columns are computed, the rows are identical to expand_features)
+
+    Args:
+        embeddings (np.ndarray): The embeddings, one row per text
+        target_length (int): The expanded size
+
+    Returns:
+        np.ndarray: The (n, target_length) expanded embeddings
+    """
+    count, dim = embeddings.shape
+    left, right = quadratic_indices(dim, target_length)
+    linear = min(dim, target_length - 1)
+
+    expanded = np.zeros((count, target_length), dtype=embeddings.dtype)
+    expanded[:, 0] = 1
+    expanded[:, 1 : 1 + linear] = embeddings[:, :linear]
+    start = 1 + linear
+    np.multiply(embeddings[:, left], embeddings[:, right], out=expanded[:, start : start + len(left)])
+    return expanded
+
+
+def normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """
+    按行做 L2 归一化 (L2 normalize every row)
+
+    The row norms use the same dot product as np.linalg.norm on a single
+    vector, so the results are bit identical to normalizing row by row.
+
+    Args:
+        embeddings (np.ndarray): The embeddings, one row per text
+
+    Returns:
+        np.ndarray: The normalized embeddings
+    """
+    squared = np.fromiter((row.dot(row) for row in embeddings), dtype=embeddings.dtype, count=len(embeddings))
+    return embeddings / np.sqrt(squared)[:, None]
+
+
+def encode_base64(embeddings: np.ndarray) -> List[str]:
+    """
+    把每一行编码为 little-endian float32 的 base64 字符串, 与 OpenAI
+    encoding_format="base64" 相同
+    (Encode every row as base64 of its little-endian float32 bytes, like
+    OpenAI's encoding_format="base64")
+
+    Args:
+        embeddings (np.ndarray): The embeddings, one row per text
+
+    Returns:
+        List[str]: One base64 string per row
+    """
+    raw = memoryview(np.ascontiguousarray(embeddings, dtype="<f4").tobytes())
+    row_bytes = embeddings.shape[1] * 4
+    return [
+        base64.b64encode(raw[i * row_bytes : (i + 1) * row_bytes]).decode("ascii")
+        for i in range(len(embeddings))
+    ]
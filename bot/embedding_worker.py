@@ -0,0 +1,68 @@
+"""
+嵌入服务的模型推理和 token 计数, 在线程池或进程池里运行
+(Model inference and token counting of the embedding service, run on the
+thread or process pool executor of bot/test.py)
+
+The model and the tokenizer are module globals created once per process by
+init_worker, so the functions can be sent to a process pool by reference.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+_model = None
+_encoding = None
+
+
+def init_worker(model_path: str, device: str, onnx_path: str = "", onnx_threads: int = 0):
+    """
+    加载模型和 tokenizer, 每个进程一次 (Load the model and the tokenizer, once per process)
+
+    Args:
+        model_path (str): The SentenceTransformer model path
+        device (str): The torch device, e.g. "cpu" or "cuda"
+        onnx_path (str): The exported ONNX model, serves it instead of the torch model if set
+        onnx_threads (int): Intra-op threads of onnxruntime
+    """
+    global _model, _encoding
+    import tiktoken
+
+    if onnx_path:
+        from onnx_backend import OnnxEncoder
+
+        _model = OnnxEncoder(model_path, onnx_path, onnx_threads)
+    else:
+        from sentence_transformers import SentenceTransformer
+
+        _model = SentenceTransformer(model_path, device=device)
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+
+def encode_texts(texts: List[str], batch_size: int) -> np.ndarray:
+    """
+    一次批量编码 (Embed the texts in one batched call)
+
+    Args:
+        texts (List[str]): The texts
+        batch_size (int): The model batch size
+
+    Returns:
+        np.ndarray: The embeddings, one row per text
+    """
+    return _model.encode(texts, batch_size=batch_size)
+
+
+def count_tokens(texts: List[str]) -> Tuple[int, int]:
+    """
+    批量计算用量 (Count the usage of the texts in one batch)
+
+    Args:
+        texts (List[str]): The texts
+
+    Returns:
+        The whitespace separated word count and the cl100k_base token count
+    """
+    prompt_tokens = sum(len(text.split()) for text in texts)
+    total_tokens = sum(len(tokens) for tokens in _encoding.encode_batch(texts))
+    return prompt_tokens, total_tokens
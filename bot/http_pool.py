@@ -0,0 +1,180 @@
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from logger import get_logger
+
+
+class ConnectionStats:
+    """
+    Connection reuse counters of one upstream
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "new_connections": self.connections,
+            "reused_connections": max(self.requests - self.connections, 0),
+            "tls_handshakes": self.tls_handshakes,
+        }
+
+
+class _CountingTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps a shared transport and counts new connections through the httpcore
+    trace extension. Closing it is a no-op, the pool owns the transport.
+    """
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport, stats: ConnectionStats):
+        self.transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.requests += 1
+        parent_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict):
+            if event_name == "connection.connect_tcp.complete":
+                self.stats.connections += 1
+            elif event_name == "connection.start_tls.complete":
+                self.stats.tls_handshakes += 1
+            if parent_trace is not None:
+                result = parent_trace(event_name, info)
+                if hasattr(result, "__await__"):
+                    await result
+
+        request.extensions["trace"] = trace
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self):
+        pass
+
+
+class HttpClientPool:
+    """
+    A process-wide pool of HTTP connections for the upstream model backends,
+    keyed by the origin of ``api_base``. Every bot pointing at the same origin
+    shares one connection pool.
+
+    Args:
+        max_connections (int): Maximum number of connections per upstream
+        max_keepalive_connections (int): Maximum number of idle keep-alive connections per upstream
+        keepalive_expiry (float): Seconds an idle connection is kept alive
+        http2 (bool): Enable HTTP/2, requires the ``h2`` package
+        connect_timeout (float): Connect timeout in seconds
+        read_timeout (float): Read timeout in seconds
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 600.0,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.logger = get_logger("HttpClientPool")
+
+        self._transports: Dict[str, _CountingTransport] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, ConnectionStats] = {}
+
+    @staticmethod
+    def _origin(api_base: str) -> str:
+        parts = urlsplit(api_base)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def get_transport(self, api_base: str) -> httpx.AsyncBaseTransport:
+        """
+        Get the shared transport of the given upstream
+
+        Args:
+            api_base (str): The upstream API base URL
+
+        Returns:
+            httpx.AsyncBaseTransport: The shared transport
+        """
+        origin = self._origin(api_base)
+        transport = self._transports.get(origin)
+        if transport is None:
+            self.logger.info(f"Creating connection pool for {origin}")
+            stats = ConnectionStats()
+            transport = _CountingTransport(
+                httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2),
+                stats,
+            )
+            self._transports[origin] = transport
+            self._stats[origin] = stats
+        return transport
+
+    def get_async_client(self, api_base: str) -> httpx.AsyncClient:
+        """
+        Get the shared async client of the given upstream
+
+        Args:
+            api_base (str): The upstream API base URL
+
+        Returns:
+            httpx.AsyncClient: The shared client
+        """
+        origin = self._origin(api_base)
+        client = self._clients.get(origin)
+        if client is None:
+            client = httpx.AsyncClient(
+                transport=self.get_transport(api_base), timeout=self.timeout
+            )
+            self._clients[origin] = client
+        return client
+
+    def get_client_kwargs(self, api_base: str) -> Dict:
+        """
+        Get the kwargs for libraries building their own httpx client (e.g. ollama)
+
+        Args:
+            api_base (str): The upstream API base URL
+
+        Returns:
+            Dict: The client kwargs with the shared transport and timeouts
+        """
+        return {"transport": self.get_transport(api_base), "timeout": self.timeout}
+
+    def stats(self) -> Dict:
+        return {origin: stats.to_dict() for origin, stats in self._stats.items()}
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        for transport in self._transports.values():
+            await transport.transport.aclose()
+        self._clients.clear()
+        self._transports.clear()
+
+
+# global http client pool
+http_client_pool: Optional[HttpClientPool] = None
+
+
+def get_http_client_pool() -> HttpClientPool:
+    global http_client_pool
+    if http_client_pool is None:
+        http_client_pool = HttpClientPool()
+    return http_client_pool
+
+
+def set_http_client_pool(pool: HttpClientPool):
+    global http_client_pool
+    http_client_pool = pool
@@ -0,0 +1,25 @@
+from typing import AsyncIterable, List, override
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from models import BaseBot, Message
+
+
+class LangChainBot(BaseBot):
+    """
+    Base class for the bots backed by a LangChain chat model
+    """
+
+    @override
+    def convert_message(self, role: str, content: str) -> Message:
+        if role == "user":
+            return HumanMessage(content=content)
+        elif role == "system":
+            return SystemMessage(content=content)
+        return AIMessage(content=content)
+
+    @override
+    async def _open_stream(self, model, messages: List[Message]) -> AsyncIterable[str]:
+        async for chunk in model.astream(messages):
+            # self.logger.debug(f"Bot {self.config.bot_name} generated chunk: {chunk.content}")
+            yield chunk.content
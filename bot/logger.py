@@ -1,19 +1,198 @@
 import argparse
+import atexit
 import logging
+import logging.handlers
+import queue
+import random
 import sys
 import os
-from typing import Optional, Union
+import threading
+import time
+from typing import Dict, List, Optional, Union
 import coloredlogs
+from humanfriendly.terminal import terminal_supports_colors
 from functools import wraps
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+
+LOG_FORMAT = "%(asctime)s | %(levelname)8s | %(name)s | %(filename)s:%(lineno)d | %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+LOG_FIELD_STYLES = {
+    "asctime": {"color": "green"},
+    "levelname": {"bold": True, "color": "cyan"},
+    "name": {"color": "blue"},
+    "filename": {"color": "magenta"},
+    "lineno": {"color": "yellow"},
+}
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+# all loggers are children of this logger, which holds the only handlers
+ROOT_LOGGER_NAME = "bot"
+
+
+class SizeTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    A file handler rotating both on size and on a fixed time interval.
+
+    Args:
+        filename (str): The log file path
+        max_bytes (int): Rotate when the file would exceed this size, 0 to disable
+        interval (float): Rotate every interval seconds, 0 to disable
+        backup_count (int): Number of rotated files to keep
+    """
+
+    def __init__(self, filename: str, max_bytes: int = 0, interval: float = 0, backup_count: int = 5):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.interval = interval
+        self.next_rollover = time.time() + interval if interval > 0 else 0.0
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.interval > 0 and time.time() >= self.next_rollover:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval > 0:
+            self.next_rollover = time.time() + self.interval
+
+
+def emit_batch(handler: logging.StreamHandler, records: List[logging.LogRecord]):
+    """
+    Write a batch of records through a stream handler with a single flush
+
+    Args:
+        handler (logging.StreamHandler): The handler to write with
+        records (List[logging.LogRecord]): The records to write
+    """
+    rotating = isinstance(handler, logging.handlers.BaseRotatingHandler)
+    handler.acquire()
+    try:
+        for record in records:
+            if record.levelno < handler.level or not handler.filter(record):
+                continue
+            try:
+                if rotating and handler.shouldRollover(record):
+                    handler.stream.flush()
+                    handler.doRollover()
+                if handler.stream is None:
+                    handler.stream = handler._open()
+                handler.stream.write(handler.format(record) + handler.terminator)
+            except Exception:
+                handler.handleError(record)
+        if handler.stream is not None:
+            handler.stream.flush()
+    finally:
+        handler.release()
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    A queue handler with a bounded queue and an overflow policy.
+
+    Args:
+        log_queue (queue.Queue): The bounded queue
+        overflow_policy (str): "drop_newest" drops the incoming record,
+            "drop_oldest" drops the oldest queued record and "block" waits
+            for room (stalls the caller, including the event loop)
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow_policy: str = "drop_newest"):
+        super().__init__(log_queue)
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid log overflow policy: {overflow_policy}")
+        self.overflow_policy = overflow_policy
+        self.enqueued = 0
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.overflow_policy == "block":
+            self.queue.put(record)
+            self.enqueued += 1
+            return
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+            return
+        except queue.Full:
+            pass
+        if self.overflow_policy == "drop_oldest":
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(record)
+                self.enqueued += 1
+            except queue.Full:
+                pass
+        self.dropped += 1
+
+
+class BatchingQueueListener:
+    """
+    Drains the log queue on a background thread and writes the records to
+    the handlers in batches.
+
+    Args:
+        log_queue (queue.Queue): The queue to drain
+        handlers (List[logging.StreamHandler]): The handlers to write to
+        batch_size (int): Maximum number of records written per batch
+    """
+
+    _sentinel = None
+
+    def __init__(self, log_queue: queue.Queue, handlers: List[logging.StreamHandler], batch_size: int = 256):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.written = 0
+        self.batches = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        # the sentinel must get through even when the queue is full
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            stop = record is self._sentinel
+            batch = [] if stop else [record]
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stop = True
+                    break
+                batch.append(record)
+
+            if batch:
+                for handler in self.handlers:
+                    emit_batch(handler, batch)
+                self.written += len(batch)
+                self.batches += 1
+            if stop:
+                return
 
 
 class LoggerManager:
     """
     A logger manager to configure and manage loggers.
 
+    The handlers are installed once on the "bot" root logger, loggers handed
+    out by get_logger are plain children propagating to it. Creating a logger
+    and changing levels never installs handlers again.
+
     Args:
         console_level (str): The logging level for the console handler.
             Defaults to 'INFO'.
@@ -21,6 +200,16 @@ class LoggerManager:
             Defaults to 'DEBUG'.
         log_file (Optional[str]): The path to the log file. If not provided,
             no file handler will be created.
+        async_mode (bool): Write logs from a background thread through a
+            bounded queue instead of from the calling thread.
+        queue_size (int): Maximum number of queued records in async mode.
+        overflow_policy (str): What to do when the queue is full, one of
+            "drop_newest", "drop_oldest" or "block".
+        batch_size (int): Maximum number of records written per batch.
+        rotate_max_bytes (int): Rotate the log file at this size, 0 to disable.
+        rotate_interval (float): Rotate the log file every interval seconds,
+            0 to disable.
+        rotate_backup_count (int): Number of rotated log files to keep.
     """
 
     def __init__(
@@ -28,6 +217,13 @@ class LoggerManager:
         console_level: str = "INFO",
         file_level: str = "DEBUG",
         log_file: Optional[str] = "app.log",
+        async_mode: bool = False,
+        queue_size: int = 10000,
+        overflow_policy: str = "drop_newest",
+        batch_size: int = 256,
+        rotate_max_bytes: int = 0,
+        rotate_interval: float = 0,
+        rotate_backup_count: int = 5,
     ):
         # Create the main logger
         self.loggers = {}
@@ -35,57 +231,129 @@ class LoggerManager:
         self.console_level = console_level
         self.file_level = file_level
         self.log_file = log_file
+        self.async_mode = async_mode
+        self.rotate_max_bytes = rotate_max_bytes
+        self.rotate_interval = rotate_interval
+        self.rotate_backup_count = rotate_backup_count
 
-        self.logger = self.init_logger("logger_manager")
+        self.root = logging.getLogger(ROOT_LOGGER_NAME)
+        self.console_handler: Optional[logging.Handler] = None
+        self.file_handler: Optional[logging.Handler] = None
+        self.queue_handler: Optional[BoundedQueueHandler] = None
+        self.listener: Optional[BatchingQueueListener] = None
 
-    def colored_console_install(self, logger: logging.Logger):
-        """
-        Install colored logs for the console
-        """
-        coloredlogs.install(
-            level=self.console_level.upper(),
-            logger=logger,
-            fmt="%(asctime)s | %(levelname)8s | %(name)s | %(filename)s:%(lineno)d | %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-            field_styles={
-                "asctime": {"color": "green"},
-                "levelname": {"bold": True, "color": "cyan"},
-                "name": {"color": "blue"},
-                "filename": {"color": "magenta"},
-                "lineno": {"color": "yellow"},
-            },
+        print(
+            f"Initializing logger manager with level {self.console_level} and file level {self.file_level} and log file {self.log_file}"
         )
+        self.install_handlers(queue_size, overflow_policy, batch_size)
 
-    def init_logger(self, name: Optional[str] = None):
+        self.logger = self.get_logger("logger_manager")
+
+    def install_handlers(self, queue_size: int, overflow_policy: str, batch_size: int):
+        """
+        Install the handlers on the root logger, replacing the handlers of any
+        previous manager
         """
-        Initialize the logger
+        self.console_handler = self.create_console_handler()
+        if self.log_file:
+            self.file_handler = self.create_file_handler()
+
+        if self.async_mode:
+            handlers = [self.console_handler]
+            if self.file_handler is not None:
+                handlers.append(self.file_handler)
+            log_queue = queue.Queue(maxsize=queue_size)
+            self.queue_handler = BoundedQueueHandler(log_queue, overflow_policy)
+            self.listener = BatchingQueueListener(log_queue, handlers, batch_size)
+            self.listener.start()
+            atexit.register(self.shutdown)
+            root_handlers = [self.queue_handler]
+        else:
+            root_handlers = [self.console_handler]
+            if self.file_handler is not None:
+                root_handlers.append(self.file_handler)
+
+        # close the replaced handlers, a file handler would keep its file open
+        for handler in list(self.root.handlers):
+            self.root.removeHandler(handler)
+            handler.close()
+        for handler in root_handlers:
+            self.root.addHandler(handler)
+        self.root.propagate = False
+        self.update_root_level()
+
+    def update_root_level(self):
+        """
+        Set the root logger level to the lowest handler level, so records no
+        handler would write are dropped before they are formatted
         """
+        levels = logging.getLevelNamesMapping()
+        level = levels[self.console_level.upper()]
+        if self.file_handler is not None:
+            level = min(level, levels[self.file_level.upper()])
+        self.root.setLevel(level)
 
-        logger = logging.getLogger(name or "bot_logger")
+    def create_console_handler(self) -> logging.Handler:
+        """
+        Create the console handler, colored when stderr is a terminal
+        """
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setLevel(self.console_level.upper())
+        if terminal_supports_colors(sys.stderr):
+            formatter = coloredlogs.ColoredFormatter(
+                fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT, field_styles=LOG_FIELD_STYLES
+            )
+        else:
+            formatter = logging.Formatter(fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+        console_handler.setFormatter(formatter)
+        return console_handler
 
-        print(
-            f"Initializing logger for {name} with level {self.console_level} and file level {self.file_level} and log file {self.log_file}"
+    def create_file_handler(self) -> logging.FileHandler:
+        """
+        Create the file handler, rotating if rotation is configured
+        """
+        logfile_dir = os.path.dirname(os.path.abspath(self.log_file))
+        if not os.path.exists(logfile_dir):
+            os.makedirs(logfile_dir, exist_ok=True)
+        if self.rotate_max_bytes > 0 or self.rotate_interval > 0:
+            file_handler = SizeTimeRotatingFileHandler(
+                self.log_file,
+                max_bytes=self.rotate_max_bytes,
+                interval=self.rotate_interval,
+                backup_count=self.rotate_backup_count,
+            )
+        else:
+            file_handler = logging.FileHandler(self.log_file, encoding="utf-8")
+        file_handler.setLevel(self.file_level.upper())
+        file_handler.setFormatter(
+            logging.Formatter(fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
         )
+        return file_handler
 
-        # Console log handler
-        self.colored_console_install(logger)
-
-        # File log handler
-        if self.log_file:
-            # logfile directory
-            logfile_dir = os.path.dirname(os.path.abspath(self.log_file))
-            if not os.path.exists(logfile_dir):
-                os.makedirs(logfile_dir, exist_ok=True)
-            file_handler = logging.FileHandler(self.log_file, encoding="utf-8")
-            file_handler.setLevel(self.file_level.upper())
-            file_formatter = logging.Formatter(
-                fmt="%(asctime)s | %(levelname)8s | %(name)s | %(filename)s:%(lineno)d | %(message)s",
-                datefmt="%Y-%m-%d %H:%M:%S",
-            )
-            file_handler.setFormatter(file_formatter)
-            logger.addHandler(file_handler)
+    def shutdown(self):
+        """
+        Flush the queued records, stop the background writer and close its
+        handlers
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
 
-        return logger
+    def stats(self) -> Dict:
+        """
+        Get the counters of the async log pipeline
+        """
+        if self.queue_handler is None:
+            return {"async": False}
+        return {
+            "async": True,
+            "queued": self.queue_handler.queue.qsize(),
+            "enqueued": self.queue_handler.enqueued,
+            "dropped": self.queue_handler.dropped,
+            "written": self.listener.written if self.listener else 0,
+            "batches": self.listener.batches if self.listener else 0,
+        }
 
     def get_logger(self, name: Optional[str] = None):
         """
@@ -97,10 +365,11 @@ class LoggerManager:
         Returns:
             logging.Logger: The configured logger
         """
-        # self.logger.debug(f"Getting logger for {name}")
-        if name not in self.loggers:
-            self.loggers[name] = self.init_logger(name)
-        return self.loggers[name]
+        logger = self.loggers.get(name)
+        if logger is None:
+            logger = self.root.getChild(name) if name else self.root
+            self.loggers[name] = logger
+        return logger
 
     def log_method(self, level="info"):
         """
@@ -178,11 +447,16 @@ class LoggerManager:
             console_log_level (Optional[str]): The console log level
             file_log_level (Optional[str]): The file log level
         """
-        self.console_level = console_log_level
-        self.file_level = file_log_level
-
-        for name in self.loggers:
-            self.loggers[name] = self.init_logger(name)
+        console_log_level = console_log_level or log_level
+        file_log_level = file_log_level or log_level
+        if console_log_level:
+            self.console_level = console_log_level
+            self.console_handler.setLevel(console_log_level.upper())
+        if file_log_level:
+            self.file_level = file_log_level
+            if self.file_handler is not None:
+                self.file_handler.setLevel(file_log_level.upper())
+        self.update_root_level()
 
     @classmethod
     def from_args(cls, args: Union[argparse.Namespace, dict]):
@@ -224,30 +498,69 @@ class LoggerManager:
     #     )
 
 
-class FastAPILogMiddleware(BaseHTTPMiddleware):
+class AccessLogMiddleware:
     """
-    A middleware to log information about incoming requests and outgoing responses.
+    A pure ASGI middleware writing one access log line per request, after the
+    response has been fully sent. For streaming responses it measures the
+    real time to first byte, time to last byte and the bytes sent.
 
     Args:
-        app (FastAPI): The FastAPI application instance.
+        app (ASGIApp): The wrapped ASGI application.
         logger_manager (LoggerManager): The logger manager instance.
+        sample_rate (float): Fraction of requests to log, 1.0 logs all.
     """
 
-    def __init__(self, app, logger_manager: LoggerManager):
-        super().__init__(app)
-        self.logger = logger_manager.get_logger("fastapi")
-
-    async def dispatch(self, request: Request, call_next):
-        # Log the request information
-        self.logger.info(f"Request: {request.method} {request.url}")
-
-        # Process the request
-        response: Response = await call_next(request)
-
-        # Log the response information
-        self.logger.info(f"Response: {response.status_code}")
-
-        return response
+    def __init__(self, app, logger_manager: LoggerManager, sample_rate: float = 1.0):
+        self.app = app
+        self.logger = logger_manager.get_logger("access")
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (
+            self.sample_rate < 1.0 and random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 0
+        sent = 0
+        first_byte: Optional[float] = None
+        last_byte: Optional[float] = None
+
+        async def send_with_timing(message):
+            nonlocal status, sent, first_byte, last_byte
+            message_type = message["type"]
+            if message_type == "http.response.body":
+                body = message.get("body", b"")
+                if body:
+                    sent += len(body)
+                    if first_byte is None:
+                        first_byte = time.perf_counter()
+                if not message.get("more_body", False):
+                    last_byte = time.perf_counter()
+            elif message_type == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            client = scope.get("client")
+            ttfb = f"{(first_byte - start) * 1000:.1f}ms" if first_byte is not None else "-"
+            ttlb = f"{(last_byte - start) * 1000:.1f}ms" if last_byte is not None else "-"
+            line = (
+                f'{client[0] if client else "-"} "{scope["method"]} {scope["path"]}" '
+                f"{status or '-'} bytes={sent} ttfb={ttfb} ttlb={ttlb}"
+            )
+            if error is not None:
+                self.logger.warning(f"{line} error={type(error).__name__}")
+            else:
+                self.logger.info(line)
 
 
 # global logger manager
@@ -265,7 +578,10 @@ def get_logger(name: Optional[str] = None):
 
 def set_logger_manager(logger_manager_instance: LoggerManager):
     global logger_manager
-    logger_manager = logger_manager_instance
+    previous, logger_manager = logger_manager, logger_manager_instance
+    # the new manager replaced the root handlers, stop the old writer thread
+    if previous is not logger_manager_instance:
+        previous.shutdown()
 
 
 def get_logger_manager():
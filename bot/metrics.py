@@ -0,0 +1,268 @@
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# default buckets in seconds for latencies
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0)
+# default buckets for counts per response
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# default buckets for tokens per second
+RATE_BUCKETS = (1, 5, 10, 20, 40, 60, 100, 200, 500)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class _HistogramChild:
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """
+    A metric family with a single ``bot`` style label, children are created
+    once per label value and should be kept by the caller
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label: str):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.children: Dict[str, object] = {}
+
+    def labels(self, value: str):
+        child = self.children.get(value)
+        if child is None:
+            child = self._new_child()
+            self.children[value] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for value, child in self.children.items():
+            lines.extend(self._render_child(f'{self.label}="{_escape(value)}"', child))
+        return lines
+
+    def _render_child(self, labels: str, child) -> List[str]:
+        return [f"{self.name}{{{labels}}} {_format_value(child.value)}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label: str, buckets: Tuple[float, ...]):
+        super().__init__(name, documentation, label)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, labels: str, child: _HistogramChild) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            lines.append(
+                f'{self.name}_bucket{{{labels},le="{_format_value(float(bound))}"}} {cumulative}'
+            )
+        lines.append(f"{self.name}_sum{{{labels}}} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{{{labels}}} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    A minimal registry rendering the Prometheus text exposition format.
+
+    Observations are plain attribute updates on the event loop thread, so
+    recording stays cheap enough to leave on in production. With several
+    workers every worker has its own registry.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label: str = "bot") -> Counter:
+        return self._register(Counter(name, documentation, label))
+
+    def gauge(self, name: str, documentation: str, label: str = "bot") -> Gauge:
+        return self._register(Gauge(name, documentation, label))
+
+    def histogram(
+        self, name: str, documentation: str, buckets: Tuple[float, ...], label: str = "bot"
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StreamRecorder:
+    """
+    Records the metrics of one response stream
+    """
+
+    __slots__ = ("metrics", "start", "first", "frames", "chars", "upstream_chunks", "done")
+
+    def __init__(self, metrics: "BotMetrics"):
+        self.metrics = metrics
+        self.start = time.perf_counter()
+        self.first: Optional[float] = None
+        self.frames = 0
+        self.chars = 0
+        self.upstream_chunks = 0
+        self.done = False
+        metrics.in_flight.inc()
+
+    def frame(self, text: str):
+        if self.first is None:
+            self.first = time.perf_counter()
+        self.frames += 1
+        self.chars += len(text)
+
+    def error(self):
+        self.metrics.errors.inc()
+
+    def rejected(self):
+        self.metrics.rejected.inc()
+
+    def finish(self):
+        if self.done:
+            return
+        self.done = True
+        metrics = self.metrics
+        metrics.in_flight.dec()
+        end = time.perf_counter()
+        metrics.duration.observe(end - self.start)
+        if self.first is None:
+            return
+        metrics.ttft.observe(self.first - self.start)
+        metrics.frames.observe(self.frames)
+        metrics.chars.observe(self.chars)
+        if self.upstream_chunks > 1 and end > self.first:
+            metrics.tokens_per_second.observe(self.upstream_chunks / (end - self.first))
+
+
+class BotMetrics:
+    """
+    The metric children of one bot
+
+    Args:
+        bot_name (str): The bot name used as label value
+        registry (MetricsRegistry): The registry to record into
+    """
+
+    def __init__(self, bot_name: str, registry: "MetricsRegistry"):
+        self.ttft = registry.histogram(
+            "poe_bot_time_to_first_token_seconds",
+            "Time from request to the first response frame",
+            LATENCY_BUCKETS,
+        ).labels(bot_name)
+        self.duration = registry.histogram(
+            "poe_bot_stream_duration_seconds",
+            "Total duration of the response stream",
+            LATENCY_BUCKETS,
+        ).labels(bot_name)
+        self.frames = registry.histogram(
+            "poe_bot_response_chunks",
+            "Number of frames sent per response",
+            COUNT_BUCKETS,
+        ).labels(bot_name)
+        self.chars = registry.histogram(
+            "poe_bot_response_characters",
+            "Number of characters sent per response",
+            COUNT_BUCKETS,
+        ).labels(bot_name)
+        self.tokens_per_second = registry.histogram(
+            "poe_bot_tokens_per_second",
+            "Upstream chunks per second after the first frame",
+            RATE_BUCKETS,
+        ).labels(bot_name)
+        self.in_flight = registry.gauge(
+            "poe_bot_requests_in_flight", "Number of responses being streamed"
+        ).labels(bot_name)
+        self.errors = registry.counter(
+            "poe_bot_upstream_errors_total", "Number of failed upstream streams"
+        ).labels(bot_name)
+        self.rejected = registry.counter(
+            "poe_bot_rejected_total", "Number of requests rejected by admission control"
+        ).labels(bot_name)
+
+    def start(self) -> StreamRecorder:
+        return StreamRecorder(self)
+
+
+# global metrics registry
+metrics_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return metrics_registry
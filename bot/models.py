@@ -1,19 +1,38 @@
+import asyncio
+import importlib
+import time
 from abc import ABC, abstractmethod
-from typing import AsyncIterable, Tuple, List, override
+from contextlib import nullcontext
+from typing import Any, AsyncIterable, Dict, Tuple, List, Optional, Type
 from enum import Enum, auto
 
 
 import fastapi_poe as fp
 from pydantic import BaseModel, Field
-from langchain.schema import AIMessage, HumanMessage, SystemMessage
-from langchain_ollama import ChatOllama
-from langchain_openai import ChatOpenAI
 
 from logger import get_logger
+from cache import ResponseCache
+from streaming import ChunkCoalescer
+from tokens import TokenCounter
+from admission import AdmissionController, AdmissionRejected, ConcurrencyLimiter, get_backend_limiters
+from routing import Endpoint, EndpointRouter
+from metrics import BotMetrics, StreamRecorder, get_metrics_registry
+from singleflight import SingleFlight
+from conversation import ConversationStore
+from summary import SUMMARY_SYSTEM_PROMPT, ConversationSummarizer, format_transcript
 
 class BotType(Enum):
     OPENAI = auto()
     OLLAMA = auto()
+    OPENAI_NATIVE = auto()
+    OLLAMA_NATIVE = auto()
+
+# a backend specific chat message, exposing .type and .content
+Message = Any
+
+class EndpointConfig(BaseModel):
+    api_base: str = Field(default="")
+    api_key: str = Field(default="")
 
 class BaseBotConfig(BaseModel):
     bot_type: BotType = Field(default=BotType.OPENAI)
@@ -21,12 +40,62 @@ class BaseBotConfig(BaseModel):
     model: str = Field(default="gpt-4o")
     api_base: str = Field(default="https://api.openai.com/v1")
     api_key: str = Field(default="")
+    # extra endpoints, api_base/api_key are used when empty
+    endpoints: List[EndpointConfig] = Field(default_factory=list)
+    endpoint_max_failures: int = Field(default=3)
+    endpoint_eject_seconds: float = Field(default=30.0)
+    # send a hedged request when no first chunk arrived after this many seconds
+    hedge_after: Optional[float] = Field(default=None)
     poe_key: str = Field(default="")
     history_length: int = Field(default=10)
+    # trim history by token budget instead of message count when set
+    max_prompt_tokens: Optional[int] = Field(default=None)
     temperature: float = Field(default=0.7)
     # for ollama: Max number of tokens to generate.
     num_predict: int = Field(default=1024)
     sub_url: str = Field(default="/bot")
+    # response cache
+    cache_enabled: bool = Field(default=False)
+    cache_ttl: int = Field(default=3600)
+    cache_max_entries: int = Field(default=1024)
+    cache_max_bytes: int = Field(default=64 * 1024 * 1024)
+    cache_dir: Optional[str] = Field(default=None)
+    # skip the response and semantic caches when temperature is above this value, None means always cache
+    cache_max_temperature: Optional[float] = Field(default=None)
+    # chunk coalescing, disabled when the window is 0
+    coalesce_window_ms: int = Field(default=0)
+    coalesce_max_bytes: int = Field(default=512)
+    # admission control, max_concurrency None means unlimited
+    max_concurrency: Optional[int] = Field(default=None)
+    max_queue: int = Field(default=100)
+    max_queue_wait: float = Field(default=10.0)
+    # share one upstream stream between identical concurrent requests
+    singleflight_enabled: bool = Field(default=False)
+    # semantic response cache, matches single turn questions by embedding similarity
+    semantic_cache_enabled: bool = Field(default=False)
+    semantic_cache_api_base: str = Field(default="http://localhost:6008/v1")
+    semantic_cache_api_key: str = Field(default="")
+    semantic_cache_model: str = Field(default="m3e")
+    semantic_cache_threshold: float = Field(default=0.92)
+    semantic_cache_max_entries: int = Field(default=4096)
+    semantic_cache_timeout: float = Field(default=1.0)
+    # keep the prepared messages per conversation, only new messages are converted
+    conversation_state_enabled: bool = Field(default=False)
+    conversation_state_max_entries: int = Field(default=1024)
+    conversation_state_ttl: float = Field(default=3600)
+    conversation_state_max_bytes: int = Field(default=32 * 1024 * 1024)
+    # fold old turns into a running summary generated in the background
+    summary_enabled: bool = Field(default=False)
+    # summary model and endpoint, the bot model and first endpoint when None
+    summary_model: Optional[str] = Field(default=None)
+    summary_api_base: Optional[str] = Field(default=None)
+    summary_api_key: Optional[str] = Field(default=None)
+    # summary_after + summary_keep must not exceed history_length
+    summary_after: int = Field(default=4)
+    summary_keep: int = Field(default=4)
+    summary_max_tokens: int = Field(default=512)
+    summary_max_entries: int = Field(default=1024)
+    summary_ttl: float = Field(default=3600)
 
 class BaseBot(fp.PoeBot):
     """
@@ -36,6 +105,9 @@ class BaseBot(fp.PoeBot):
     config (BaseBotConfig): The config for the bot
     """
 
+    # api base used when the config does not set one
+    DEFAULT_API_BASE = "https://api.openai.com/v1"
+
     def __init__(self, config: BaseBotConfig):
         """
         Initializes the bot
@@ -51,15 +123,262 @@ class BaseBot(fp.PoeBot):
         self.path = config.sub_url
         self.logger = get_logger(config.bot_name)
         self.logger.info(f"Bot {config.bot_name} initialized")
-        self.chat_model = self.init_model()
-        
+        self.router = self.init_router()
+        self.chat_model = self.router.endpoints[0].model
+        self.cache = self.init_cache()
+        self.coalescer = (
+            ChunkCoalescer(self.config.coalesce_window_ms, self.config.coalesce_max_bytes)
+            if self.config.coalesce_window_ms > 0
+            else None
+        )
+        self.token_counter = (
+            TokenCounter(self.config.model)
+            if self.config.max_prompt_tokens is not None
+            else None
+        )
+        self.admission = self.init_admission()
+        self.singleflight = SingleFlight() if self.config.singleflight_enabled else None
+        self.semantic_cache = self.init_semantic_cache()
+        self.conversations = (
+            ConversationStore(
+                max_entries=self.config.conversation_state_max_entries,
+                ttl=self.config.conversation_state_ttl,
+                max_bytes=self.config.conversation_state_max_bytes,
+            )
+            if self.config.conversation_state_enabled
+            else None
+        )
+        self.summary_model = None
+        self.summary_admission: Optional[AdmissionController] = None
+        self.summarizer = self.init_summarizer()
+        self.metrics = BotMetrics(config.bot_name, get_metrics_registry())
+        # number of responses being generated, used to drain a replaced bot
+        self.in_flight = 0
+        self.drained: Optional[asyncio.Event] = None
+
+    async def drain(self):
+        """
+        Waits until every in-flight response of the bot has finished
+        """
+        if self.in_flight == 0:
+            return
+        self.drained = asyncio.Event()
+        await self.drained.wait()
+
+    def init_router(self) -> EndpointRouter:
+        """
+        Initializes a chat model for every endpoint of the bot and the router
+        choosing between them. The backend limiters are held per endpoint.
+
+        Returns:
+        The endpoint router
+        """
+        endpoint_configs = self.config.endpoints or [
+            EndpointConfig(api_base=self.config.api_base or "", api_key=self.config.api_key or "")
+        ]
+        endpoints = []
+        for endpoint_config in endpoint_configs:
+            api_base = endpoint_config.api_base or self.DEFAULT_API_BASE
+            endpoints.append(
+                Endpoint(
+                    api_base,
+                    self.init_model(api_base, endpoint_config.api_key),
+                    get_backend_limiters().get_limiter(api_base),
+                )
+            )
+        return EndpointRouter(
+            endpoints,
+            max_failures=self.config.endpoint_max_failures,
+            eject_seconds=self.config.endpoint_eject_seconds,
+            hedge_after=self.config.hedge_after,
+            queue_wait=self.config.max_queue_wait,
+        )
+
+    def init_admission(self) -> Optional[AdmissionController]:
+        """
+        Initializes the admission control of the bot
+
+        Returns:
+        The admission controller, or None if the bot is unlimited
+        """
+        if not self.config.max_concurrency:
+            return None
+        limiter = ConcurrencyLimiter(
+            f"bot:{self.config.bot_name}",
+            self.config.max_concurrency,
+            self.config.max_queue,
+        )
+        return AdmissionController([limiter], self.config.max_queue_wait)
+
+    def init_cache(self) -> Optional[ResponseCache]:
+        """
+        Initializes the response cache
 
-    
+        Returns:
+        The response cache, or None if caching is disabled for this bot
+        """
+        if not self.config.cache_enabled:
+            return None
+        if (
+            self.config.cache_max_temperature is not None
+            and self.config.temperature > self.config.cache_max_temperature
+        ):
+            self.logger.info(
+                f"Response cache disabled for bot {self.config.bot_name}: "
+                f"temperature {self.config.temperature} > {self.config.cache_max_temperature}"
+            )
+            return None
+        self.logger.info(f"Response cache enabled for bot {self.config.bot_name}")
+        return ResponseCache(
+            ttl=self.config.cache_ttl,
+            max_entries=self.config.cache_max_entries,
+            max_bytes=self.config.cache_max_bytes,
+            cache_dir=self.config.cache_dir,
+        )
+
+    def init_semantic_cache(self):
+        """
+        Initializes the semantic response cache
+
+        Returns:
+        The semantic cache, or None if it is disabled for this bot
+        """
+        if not self.config.semantic_cache_enabled:
+            return None
+        if (
+            self.config.cache_max_temperature is not None
+            and self.config.temperature > self.config.cache_max_temperature
+        ):
+            self.logger.info(
+                f"Semantic cache disabled for bot {self.config.bot_name}: "
+                f"temperature {self.config.temperature} > {self.config.cache_max_temperature}"
+            )
+            return None
+        # imported here, numpy is only needed by bots using the semantic cache
+        from semantic_cache import SemanticCache
+
+        self.logger.info(
+            f"Semantic cache enabled for bot {self.config.bot_name} "
+            f"with {self.config.semantic_cache_api_base}"
+        )
+        return SemanticCache(
+            api_base=self.config.semantic_cache_api_base,
+            api_key=self.config.semantic_cache_api_key,
+            model=self.config.semantic_cache_model,
+            threshold=self.config.semantic_cache_threshold,
+            max_entries=self.config.semantic_cache_max_entries,
+            timeout=self.config.semantic_cache_timeout,
+        )
+
+    def init_summarizer(self) -> Optional[ConversationSummarizer]:
+        """
+        Initializes the summary model and the conversation summarizer
+
+        Returns:
+        The conversation summarizer, or None if summaries are disabled for this bot
+        """
+        if not self.config.summary_enabled:
+            return None
+        if (
+            self.token_counter is None
+            and self.config.summary_after + self.config.summary_keep > self.config.history_length
+        ):
+            # the summary must replace messages the history window would send,
+            # otherwise it only adds to the prompt
+            raise ValueError(
+                f"summary_after + summary_keep ({self.config.summary_after} + {self.config.summary_keep}) "
+                f"must not exceed history_length ({self.config.history_length}) for bot {self.config.bot_name}"
+            )
+        endpoint = self.config.endpoints[0] if self.config.endpoints else EndpointConfig(
+            api_base=self.config.api_base or "", api_key=self.config.api_key or ""
+        )
+        api_base = self.config.summary_api_base or endpoint.api_base or self.DEFAULT_API_BASE
+        api_key = self.config.summary_api_key if self.config.summary_api_key is not None else endpoint.api_key
+        model = self.config.summary_model or self.config.model
+        self.logger.info(f"Conversation summaries enabled for bot {self.config.bot_name} with model {model}")
+        self.summary_model = self.init_model(
+            api_base,
+            api_key,
+            self.config.model_copy(
+                update={"model": model, "temperature": 0.0, "num_predict": self.config.summary_max_tokens}
+            ),
+        )
+        # summaries share the bot limiter and the backend limiter of the summary endpoint with replies
+        limiters = list(self.admission.limiters) if self.admission is not None else []
+        backend_limiter = get_backend_limiters().get_limiter(api_base)
+        if backend_limiter is not None:
+            limiters.append(backend_limiter)
+        self.summary_admission = (
+            AdmissionController(limiters, self.config.max_queue_wait) if limiters else None
+        )
+        return ConversationSummarizer(
+            self._summarize,
+            after=self.config.summary_after,
+            keep=self.config.summary_keep,
+            max_entries=self.config.summary_max_entries,
+            ttl=self.config.summary_ttl,
+        )
+
+    async def _summarize(self, summary: Optional[str], messages: List[fp.ProtocolMessage]) -> str:
+        """
+        Folds messages into the running summary with the summary model
+
+        Args:
+        summary (Optional[str]): The previous summary
+        messages (List[fp.ProtocolMessage]): The messages to add
+
+        Returns:
+        The new summary
+        """
+        messages = [
+            message for message in messages if not (message.role == "user" and self.is_command(message.content))
+        ]
+        prompt = [
+            self.convert_message("system", SUMMARY_SYSTEM_PROMPT),
+            self.convert_message("user", format_transcript(summary, messages)),
+        ]
+        chunks = []
+        admission = self.summary_admission.admit() if self.summary_admission is not None else nullcontext()
+        async with admission:
+            async for text in self._open_stream(self.summary_model, prompt):
+                chunks.append(text)
+        return "".join(chunks).strip()
+
+    def get_stats(self) -> Dict:
+        """
+        Gets the runtime stats of the bot
+
+        Returns:
+        The stats as a dict
+        """
+        stats = {"routing": self.router.stats()}
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        if self.coalescer is not None:
+            stats["coalesce"] = self.coalescer.stats()
+        if self.token_counter is not None:
+            stats["token_counter"] = self.token_counter.stats()
+        if self.admission is not None:
+            stats["admission"] = self.admission.stats()
+        if self.singleflight is not None:
+            stats["singleflight"] = self.singleflight.stats()
+        if self.semantic_cache is not None:
+            stats["semantic_cache"] = self.semantic_cache.stats()
+        if self.conversations is not None:
+            stats["conversations"] = self.conversations.stats()
+        if self.summarizer is not None:
+            stats["summary"] = self.summarizer.stats()
+        return stats
 
     @abstractmethod
-    def init_model(self):
+    def init_model(self, api_base: str, api_key: str, config: Optional[BaseBotConfig] = None):
         """
-        Initializes the chat model
+        Initializes the chat model for one endpoint
+
+        Args:
+        api_base (str): The endpoint API base URL
+        api_key (str): The endpoint API key
+        config (Optional[BaseBotConfig]): Overrides the model settings of the bot config
 
         Returns:
         The initialized chat model
@@ -78,22 +397,168 @@ class BaseBot(fp.PoeBot):
         Returns:
         The response as an async iterable of partial responses
         """
-        last_query = request.query[-1]
-        if self.is_command(last_query.content):
-            self.logger.debug(f"Bot {self.config.bot_name} received command: {last_query.content}")
-            async for response in self.handle_bot_command(last_query.content):
-                yield response
-            return
+        self.in_flight += 1
+        try:
+            last_query = request.query[-1]
+            if self.is_command(last_query.content):
+                self.logger.debug(f"Bot {self.config.bot_name} received command: {last_query.content}")
+                async for response in self.handle_bot_command(last_query.content):
+                    yield response
+                return
+
+            messages = self._prepare_messages(request)
+
+            recorder = self.metrics.start()
+            try:
+                cache_key = None
+                if self.cache is not None:
+                    cache_key = self._cache_key(messages)
+                    cached = await self.cache.get(cache_key)
+                    if cached is not None:
+                        self.logger.debug(f"Bot {self.config.bot_name} cache hit")
+                        for text in cached:
+                            recorder.frame(text)
+                            yield fp.PartialResponse(text=text)
+                        return
+
+                semantic_query = None
+                if self.semantic_cache is not None:
+                    cached, semantic_query = await self.semantic_cache.lookup(messages)
+                    if cached is not None:
+                        self.logger.debug(f"Bot {self.config.bot_name} semantic cache hit")
+                        for text in cached:
+                            recorder.frame(text)
+                            yield fp.PartialResponse(text=text)
+                        return
+
+                leader = True
+                if self.singleflight is not None:
+                    # identical concurrent requests share one upstream stream
+                    stream, leader = self.singleflight.stream(
+                        cache_key or self._cache_key(messages),
+                        lambda: self._open_response_stream(messages, recorder),
+                    )
+                else:
+                    stream = self._open_response_stream(messages, recorder)
+
+                chunks = []
+                try:
+                    async for text in stream:
+                        recorder.frame(text)
+                        if cache_key is not None or semantic_query is not None:
+                            chunks.append(text)
+                        yield fp.PartialResponse(text=text)
+                except AdmissionRejected as e:
+                    self.logger.warning(f"Bot {self.config.bot_name} is busy, rejected request: {e}")
+                    recorder.rejected()
+                    yield fp.ErrorResponse(
+                        text="The bot is busy right now, please try again later.",
+                        allow_retry=True,
+                    )
+                    return
+                except Exception:
+                    recorder.error()
+                    raise
+
+                # only complete responses are cached, once per flight
+                if cache_key is not None and leader:
+                    await self.cache.set(cache_key, chunks)
+                if semantic_query is not None and leader:
+                    self.semantic_cache.set(semantic_query, chunks)
+            finally:
+                recorder.finish()
+        finally:
+            self.in_flight -= 1
+            if self.in_flight == 0 and self.drained is not None:
+                self.drained.set()
 
-        messages = self._prepare_messages(request)
+    async def _open_response_stream(
+        self,
+        messages: List[Message],
+        recorder: Optional[StreamRecorder] = None,
+    ) -> AsyncIterable[str]:
+        """
+        Streams the response frames for the given messages: admission, the
+        routed upstream stream and chunk coalescing
+
+        Args:
+        messages (List[Message]): The prepared messages
+        recorder (Optional[StreamRecorder]): Counts the upstream chunks
+
+        Returns:
+        The response frames as an async iterable
+        """
+        stream = self._stream_text(messages, recorder)
+        if self.coalescer is not None:
+            stream = self.coalescer.coalesce(stream)
+
+        admission = self.admission.admit() if self.admission is not None else nullcontext()
+        async with admission:
+            async for text in stream:
+                yield text
+
+    async def _stream_text(
+        self,
+        messages: List[Message],
+        recorder: Optional[StreamRecorder] = None,
+    ) -> AsyncIterable[str]:
+        """
+        Streams the text chunks for the given messages through the endpoint router
+
+        Args:
+        messages (List[Message]): The prepared messages
+        recorder (Optional[StreamRecorder]): Counts the upstream chunks
+
+        Returns:
+        The text chunks as an async iterable
+        """
+        async for text in self.router.stream(messages, self._open_stream):
+            if recorder is not None:
+                recorder.upstream_chunks += 1
+            yield text
+
+    @abstractmethod
+    def _open_stream(
+        self, model, messages: List[Message]
+    ) -> AsyncIterable[str]:
+        """
+        Streams the text chunks of one endpoint's chat model
+
+        Args:
+        model: The chat model of the endpoint
+        messages (List[Message]): The prepared messages
+
+        Returns:
+        The text chunks as an async iterable
+        """
+        pass
+
+    def _cache_key(self, messages: List[Message]) -> str:
+        """
+        Builds the response cache key for the given prepared messages
+
+        Args:
+        messages (List[Message]): The prepared messages
 
-        async for chunk in self.chat_model.astream(messages):
-            # self.logger.debug(f"Bot {self.config.bot_name} generated chunk: {chunk.content}")
-            yield fp.PartialResponse(text=chunk.content)
+        Returns:
+        The cache key
+        """
+        return ResponseCache.make_key(
+            [(message.type, message.content) for message in messages],
+            {
+                "bot_type": self.config.bot_type.name,
+                "model": self.config.model,
+                "temperature": self.config.temperature,
+                "num_predict": self.config.num_predict,
+            },
+        )
 
-    def _prepare_messages(self, request: fp.QueryRequest) -> List[HumanMessage | SystemMessage | AIMessage]:
+    def _prepare_messages(self, request: fp.QueryRequest) -> List[Message]:
         """
-        Prepares the messages for the given request
+        Prepares the messages for the given request. With a conversation
+        summary, only the messages it does not cover are sent, after the
+        system messages and the summary. The summary is not counted against
+        max_prompt_tokens, it is bounded by summary_max_tokens.
 
         Args:
         request (fp.QueryRequest): The query request
@@ -101,22 +566,105 @@ class BaseBot(fp.PoeBot):
         Returns:
         The prepared messages
         """
-        messages = []
-        querys = (
-            request.query[len(request.query) - self.config.history_length :]
-            if len(request.query) > self.config.history_length
-            else request.query
-        )
-        for message in querys:
-            content = message.content
-            if message.role == "user" and not self.is_command(content):
-                messages.append(HumanMessage(content=content))
-            elif message.role == "system":
-                messages.append(SystemMessage(content=content))
-            elif message.role == "bot":
-                messages.append(AIMessage(content=content))
+        if self.token_counter is not None:
+            indices = self._select_history_by_tokens(request)
+        else:
+            indices = range(max(len(request.query) - self.config.history_length, 0), len(request.query))
+
+        summary = None
+        if self.summarizer is not None and request.conversation_id:
+            summary, covered = self.summarizer.lookup(request.conversation_id, request.query)
+            if summary is not None:
+                indices = [i for i in indices if i >= covered or request.query[i].role == "system"]
+
+        if self.conversations is not None and request.conversation_id:
+            # only the messages new since the previous turn are converted
+            messages = self.conversations.prepare(
+                request.conversation_id, request.query, indices, self._convert_protocol_message
+            )
+        else:
+            messages = []
+            for i in indices:
+                message = self._convert_protocol_message(request.query[i])
+                if message is not None:
+                    messages.append(message)
+
+        if summary is not None:
+            position = 0
+            while position < len(messages) and messages[position].type == "system":
+                position += 1
+            messages = messages[:position] + [
+                self.convert_message("system", f"Summary of the earlier conversation:\n{summary}")
+            ] + messages[position:]
         return messages
 
+    def _convert_protocol_message(self, message: fp.ProtocolMessage) -> Optional[Message]:
+        """
+        Converts one Poe message, commands and unknown roles are dropped
+
+        Args:
+        message (fp.ProtocolMessage): The Poe message
+
+        Returns:
+        The backend message, or None if the message is dropped
+        """
+        if message.role == "user" and not self.is_command(message.content):
+            return self.convert_message("user", message.content)
+        elif message.role in ("system", "bot"):
+            return self.convert_message(message.role, message.content)
+        return None
+
+    @abstractmethod
+    def convert_message(self, role: str, content: str) -> Message:
+        """
+        Converts a Poe message to the backend message type
+
+        Args:
+        role (str): The Poe role, one of "user", "bot" or "system"
+        content (str): The message content
+
+        Returns:
+        The backend message
+        """
+        pass
+
+    def _select_history_by_tokens(self, request: fp.QueryRequest) -> List[int]:
+        """
+        Selects the newest history that fits in max_prompt_tokens, system
+        messages are always kept and the last message is kept even if it
+        exceeds the budget on its own
+
+        Args:
+        request (fp.QueryRequest): The query request
+
+        Returns:
+        The positions of the selected messages in order
+        """
+        budget = self.config.max_prompt_tokens
+        for message in request.query:
+            if message.role == "system":
+                budget -= self.token_counter.count_message(message.content)
+
+        selected = []
+        kept_turns = 0
+        exhausted = False
+        for i in range(len(request.query) - 1, -1, -1):
+            message = request.query[i]
+            if message.role == "system":
+                selected.append(i)
+                continue
+            if exhausted or (message.role == "user" and self.is_command(message.content)):
+                continue
+            tokens = self.token_counter.count_message(message.content)
+            if tokens > budget and kept_turns > 0:
+                exhausted = True
+                continue
+            budget -= tokens
+            kept_turns += 1
+            selected.append(i)
+        selected.reverse()
+        return selected
+
     async def handle_bot_command(
         self, command: str
     ) -> AsyncIterable[fp.PartialResponse]:
@@ -152,40 +700,44 @@ class BaseBot(fp.PoeBot):
         return message.startswith("/")
 
 
-class OllamaBot(BaseBot):
-    @override
-    def init_model(self):
-        self.logger.info(f"Initializing Ollama model {self.config.model} with host {self.config.api_base}")
-        return ChatOllama(
-            model=self.config.model,
-            base_url=self.config.api_base or "http://localhost:11434",
-            temperature=self.config.temperature,
-            num_predict=self.config.num_predict,
-        )
+# bot type -> "module:Class" of its backend, imported on first use so a
+# deployment only pays for the backends it configures
+BOT_BACKENDS: Dict[BotType, str] = {
+    BotType.OPENAI: "openai_bot:OpenaiBot",
+    BotType.OLLAMA: "ollama_bot:OllamaBot",
+    BotType.OPENAI_NATIVE: "native_bot:NativeOpenaiBot",
+    BotType.OLLAMA_NATIVE: "native_bot:NativeOllamaBot",
+}
 
+# seconds spent importing each backend module
+backend_import_times: Dict[str, float] = {}
 
-class OpenaiBot(BaseBot):
-    @override
-    def init_model(self):
-        logger = get_logger(self.config.bot_name)
-        logger.info(f"Initializing OpenAI model {self.config.model} with base url {self.config.api_base}")
-        return ChatOpenAI(
-            model=self.config.model,
-            api_key=self.config.api_key,
-            base_url=self.config.api_base or "https://api.openai.com/v1",
-            temperature=self.config.temperature,
-            max_tokens=self.config.num_predict
-        )
-        
 
 class BotFactory:
+    _bot_classes: Dict[BotType, Type[BaseBot]] = {}
+
+    @staticmethod
+    def get_bot_class(bot_type: BotType) -> Type[BaseBot]:
+        bot_class = BotFactory._bot_classes.get(bot_type)
+        if bot_class is not None:
+            return bot_class
+        if bot_type not in BOT_BACKENDS:
+            raise ValueError(f"Unsupported bot type: {bot_type}")
+
+        module_name, class_name = BOT_BACKENDS[bot_type].split(":")
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        backend_import_times[module_name] = time.perf_counter() - start
+        get_logger("BotFactory").info(
+            f"Imported backend {module_name} in {backend_import_times[module_name] * 1000:.1f}ms"
+        )
+
+        bot_class = getattr(module, class_name)
+        BotFactory._bot_classes[bot_type] = bot_class
+        return bot_class
+
     @staticmethod
     def create_bot(config: BaseBotConfig) -> BaseBot:
         logger = get_logger("BotFactory")
         logger.info(f"Creating bot {config.bot_name} with type {config.bot_type}")
-        if config.bot_type == BotType.OPENAI:
-            return OpenaiBot(config)
-        elif config.bot_type == BotType.OLLAMA:
-            return OllamaBot(config)
-        else:
-            raise ValueError(f"Unsupported bot type: {config.bot_type}")
+        return BotFactory.get_bot_class(config.bot_type)(config)
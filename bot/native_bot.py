@@ -0,0 +1,209 @@
+import json
+from typing import AsyncIterable, Dict, List, Optional, override
+
+import httpx
+
+from http_pool import get_http_client_pool
+from models import BaseBot, BaseBotConfig, Message
+
+# Poe role -> message type, the same types LangChain messages report
+MESSAGE_TYPES = {"user": "human", "system": "system", "bot": "ai"}
+
+# message type -> role on the wire
+WIRE_ROLES = {"human": "user", "system": "system", "ai": "assistant"}
+
+SSE_DATA_PREFIX = b"data:"
+SSE_DONE = b"[DONE]"
+
+
+class ChatMessage:
+    """
+    A plain chat message for the native backends, exposing the same ``.type``
+    and ``.content`` as LangChain messages
+    """
+
+    __slots__ = ("type", "content")
+
+    def __init__(self, type: str, content: str):
+        self.type = type
+        self.content = content
+
+    def to_wire(self) -> Dict[str, str]:
+        return {"role": WIRE_ROLES[self.type], "content": self.content}
+
+
+async def iter_lines(byte_chunks: AsyncIterable[bytes]) -> AsyncIterable[bytes]:
+    """
+    Split a byte stream into lines without decoding it
+
+    Args:
+        byte_chunks (AsyncIterable[bytes]): The raw response body
+
+    Returns:
+        The non empty lines as an async iterable, without line endings
+    """
+    buffer = b""
+    async for chunk in byte_chunks:
+        buffer += chunk
+        if b"\n" not in chunk:
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if line:
+                yield line
+    buffer = buffer.strip()
+    if buffer:
+        yield buffer
+
+
+async def iter_sse_data(byte_chunks: AsyncIterable[bytes]) -> AsyncIterable[bytes]:
+    """
+    Minimal server sent events parser, yields the ``data:`` payloads until
+    ``[DONE]``. Comments, event names and ids are ignored, OpenAI compatible
+    servers send one line of data per event.
+
+    Args:
+        byte_chunks (AsyncIterable[bytes]): The raw response body
+
+    Returns:
+        The data payloads as an async iterable
+    """
+    async for line in iter_lines(byte_chunks):
+        if not line.startswith(SSE_DATA_PREFIX):
+            continue
+        data = line[len(SSE_DATA_PREFIX):].lstrip()
+        if data == SSE_DONE:
+            return
+        yield data
+
+
+class NativeChatClient:
+    """
+    Streams chat completions from an OpenAI compatible or an Ollama endpoint
+    over the pooled httpx client, without a LangChain model in between
+
+    Args:
+        client (httpx.AsyncClient): The client used for the requests
+        api_format (str): "openai" (SSE, /chat/completions) or "ollama" (NDJSON, /api/chat)
+        api_base (str): The endpoint API base URL
+        api_key (str): The endpoint API key, sent as a bearer token if set
+        model (str): The model name
+        temperature (Optional[float]): The sampling temperature
+        max_tokens (Optional[int]): Maximum number of generated tokens
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        api_format: str,
+        api_base: str,
+        api_key: str,
+        model: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        if api_format not in ("openai", "ollama"):
+            raise ValueError(f"Unsupported api format: {api_format}")
+        self.client = client
+        self.api_format = api_format
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+        api_base = api_base.rstrip("/")
+        self.payload: Dict = {"model": model, "stream": True}
+        if api_format == "openai":
+            self.url = f"{api_base}/chat/completions"
+            if temperature is not None:
+                self.payload["temperature"] = temperature
+            if max_tokens is not None:
+                self.payload["max_tokens"] = max_tokens
+        else:
+            self.url = f"{api_base}/api/chat"
+            options = {}
+            if temperature is not None:
+                options["temperature"] = temperature
+            if max_tokens is not None:
+                options["num_predict"] = max_tokens
+            if options:
+                self.payload["options"] = options
+
+    async def astream(self, messages: List[ChatMessage]) -> AsyncIterable[str]:
+        """
+        Stream the text chunks of a chat completion
+
+        Args:
+            messages (List[ChatMessage]): The prepared messages
+
+        Returns:
+            The non empty text chunks as an async iterable
+        """
+        payload = dict(self.payload, messages=[message.to_wire() for message in messages])
+        async with self.client.stream("POST", self.url, json=payload, headers=self.headers) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                response.raise_for_status()
+
+            if self.api_format == "openai":
+                async for data in iter_sse_data(response.aiter_bytes()):
+                    event = json.loads(data)
+                    if "error" in event:
+                        raise RuntimeError(f"Upstream error: {event['error']}")
+                    choices = event.get("choices")
+                    if not choices:
+                        continue
+                    text = (choices[0].get("delta") or {}).get("content")
+                    if text:
+                        yield text
+            else:
+                async for line in iter_lines(response.aiter_bytes()):
+                    event = json.loads(line)
+                    if "error" in event:
+                        raise RuntimeError(f"Upstream error: {event['error']}")
+                    text = (event.get("message") or {}).get("content")
+                    if text:
+                        yield text
+                    if event.get("done"):
+                        return
+
+
+class NativeBot(BaseBot):
+    """
+    Base class for the bots streaming straight from the HTTP API, subclasses
+    set the api format
+    """
+
+    API_FORMAT = "openai"
+
+    @override
+    def init_model(self, api_base: str, api_key: str, config: Optional[BaseBotConfig] = None):
+        config = config or self.config
+        self.logger.info(
+            f"Initializing native {self.API_FORMAT} model {config.model} with base url {api_base}"
+        )
+        return NativeChatClient(
+            client=get_http_client_pool().get_async_client(api_base),
+            api_format=self.API_FORMAT,
+            api_base=api_base,
+            api_key=api_key,
+            model=config.model,
+            temperature=config.temperature,
+            max_tokens=config.num_predict,
+        )
+
+    @override
+    def convert_message(self, role: str, content: str) -> Message:
+        return ChatMessage(MESSAGE_TYPES.get(role, "ai"), content)
+
+    @override
+    async def _open_stream(self, model: NativeChatClient, messages: List[Message]) -> AsyncIterable[str]:
+        async for text in model.astream(messages):
+            yield text
+
+
+class NativeOpenaiBot(NativeBot):
+    API_FORMAT = "openai"
+
+
+class NativeOllamaBot(NativeBot):
+    DEFAULT_API_BASE = "http://localhost:11434"
+    API_FORMAT = "ollama"
@@ -0,0 +1,25 @@
+from typing import Optional, override
+
+from langchain_ollama import ChatOllama
+
+from http_pool import get_http_client_pool
+from langchain_bot import LangChainBot
+from models import BaseBotConfig
+
+
+class OllamaBot(LangChainBot):
+    DEFAULT_API_BASE = "http://localhost:11434"
+
+    @override
+    def init_model(self, api_base: str, api_key: str, config: Optional[BaseBotConfig] = None):
+        config = config or self.config
+        self.logger.info(f"Initializing Ollama model {config.model} with host {api_base}")
+        return ChatOllama(
+            model=config.model,
+            base_url=api_base,
+            temperature=config.temperature,
+            num_predict=config.num_predict,
+            # ollama builds its own httpx clients, the pooled transport is async
+            # and only given to the async one
+            async_client_kwargs=get_http_client_pool().get_client_kwargs(api_base),
+        )
@@ -0,0 +1,157 @@
+"""
+嵌入服务的 ONNX CPU 推理后端, 可选动态 int8 量化
+(ONNX CPU inference backend of the embedding service, with optional dynamic
+int8 quantization)
+
+The SentenceTransformer pipeline (transformer and pooling, plus normalize if
+the model has it) is exported once as one ONNX graph, so the ONNX output
+matches SentenceTransformer.encode. Exporting needs torch and
+sentence-transformers; serving an exported model only needs onnxruntime and
+the tokenizer.
+"""
+
+import json
+import os
+from typing import List
+
+import numpy as np
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+
+def export_onnx(model_path: str, output_dir: str, quantize: bool = False) -> str:
+    """
+    导出 ONNX 模型, 已存在时直接返回 (Export the model to ONNX, once)
+
+    Args:
+        model_path (str): The SentenceTransformer model path
+        output_dir (str): Directory of the exported models
+        quantize (bool): Also write a dynamically int8 quantized model
+
+    Returns:
+        str: Path of the model to serve
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, FP32_FILE)
+    int8_path = os.path.join(output_dir, INT8_FILE)
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        st_model = SentenceTransformer(model_path, device="cpu")
+        st_model.eval()
+
+        class Pipeline(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.st_model = st_model
+
+            def forward(self, input_ids, attention_mask, token_type_ids):
+                features = {
+                    "input_ids": input_ids,
+                    "attention_mask": attention_mask,
+                    "token_type_ids": token_type_ids,
+                }
+                for module in self.st_model:
+                    features = module(features)
+                return features["sentence_embedding"]
+
+        sample = st_model.tokenizer(["onnx export"], return_tensors="pt")
+        token_type_ids = sample.get("token_type_ids", torch.zeros_like(sample["input_ids"]))
+        dynamic = {0: "batch", 1: "sequence"}
+        tmp_path = f"{fp32_path}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                Pipeline(),
+                (sample["input_ids"], sample["attention_mask"], token_type_ids),
+                tmp_path,
+                input_names=["input_ids", "attention_mask", "token_type_ids"],
+                output_names=["sentence_embedding"],
+                dynamic_axes={
+                    "input_ids": dynamic,
+                    "attention_mask": dynamic,
+                    "token_type_ids": dynamic,
+                    "sentence_embedding": {0: "batch"},
+                },
+                opset_version=17,
+            )
+        os.replace(tmp_path, fp32_path)
+        with open(os.path.join(output_dir, "export.json"), "w") as f:
+            json.dump({"model_path": model_path, "max_seq_length": st_model.max_seq_length}, f)
+
+    if not quantize:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp_path = f"{int8_path}.tmp"
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+    return int8_path
+
+
+class OnnxEncoder:
+    """
+    用 onnxruntime 在 CPU 上计算嵌入, encode 与 SentenceTransformer.encode 用法相同
+    (Embeds texts with onnxruntime on the CPU, encode() works like
+    SentenceTransformer.encode)
+
+    Args:
+        model_path (str): The SentenceTransformer model path, for the tokenizer
+        onnx_path (str): The exported ONNX model
+        threads (int): Intra-op threads of onnxruntime, 0 lets onnxruntime decide
+    """
+
+    def __init__(self, model_path: str, onnx_path: str, threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {item.name for item in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+
+        self.max_seq_length = 512
+        export_info = os.path.join(os.path.dirname(onnx_path), "export.json")
+        if os.path.exists(export_info):
+            with open(export_info) as f:
+                self.max_seq_length = json.load(f).get("max_seq_length") or self.max_seq_length
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        计算嵌入 (Embed the texts)
+
+        Args:
+            texts (List[str]): The texts
+            batch_size (int): Texts per inference call
+
+        Returns:
+            np.ndarray: The float32 embeddings, one row per text
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        # 按长度排序减少填充 (sort by length to reduce padding, like SentenceTransformer)
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start : start + batch_size]]
+            encoded = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feed = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+            if "token_type_ids" in self.input_names and "token_type_ids" not in feed:
+                feed["token_type_ids"] = np.zeros_like(feed["input_ids"])
+            outputs.append(self.session.run(None, feed)[0])
+
+        embeddings = np.empty((len(texts), outputs[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(outputs)
+        return embeddings
@@ -0,0 +1,26 @@
+from typing import Optional, override
+
+from langchain_openai import ChatOpenAI
+
+from http_pool import get_http_client_pool
+from langchain_bot import LangChainBot
+from models import BaseBotConfig
+from logger import get_logger
+
+
+class OpenaiBot(LangChainBot):
+    @override
+    def init_model(self, api_base: str, api_key: str, config: Optional[BaseBotConfig] = None):
+        config = config or self.config
+        logger = get_logger(config.bot_name)
+        logger.info(f"Initializing OpenAI model {config.model} with base url {api_base}")
+        pool = get_http_client_pool()
+        return ChatOpenAI(
+            model=config.model,
+            api_key=api_key,
+            base_url=api_base,
+            temperature=config.temperature,
+            max_tokens=config.num_predict,
+            # the pooled client carries the connect and read timeouts
+            http_async_client=pool.get_async_client(api_base),
+        )
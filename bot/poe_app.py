@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import List
+
+import fastapi_poe as fp
+from fastapi import FastAPI
+from fastapi_poe.client import PROTOCOL_VERSION
+
+from logger import get_logger
+from models import BaseBot
+
+
+def make_bots_app(bots: List[BaseBot]) -> FastAPI:
+    """
+    Builds the fastapi_poe app of the bots without syncing their settings.
+
+    fp.make_app syncs the settings of every bot with asyncio.run and a
+    blocking HTTP call, which fails inside the running event loop of the
+    uvicorn app factory and of a config reload. The bot names are hidden
+    while the routes are built so make_app skips the sync, sync_settings
+    does it on the loop afterwards.
+
+    Args:
+        bots (List[BaseBot]): The bots to serve
+
+    Returns:
+        The app serving the bots
+    """
+    names = [bot.bot_name for bot in bots]
+    # make_app warns about every bot without a name on this logger
+    poe_logger = logging.getLogger("uvicorn.default")
+    disabled = poe_logger.disabled
+    try:
+        poe_logger.disabled = True
+        for bot in bots:
+            bot.bot_name = ""
+        return fp.make_app(bots)
+    finally:
+        poe_logger.disabled = disabled
+        for bot, name in zip(bots, names):
+            bot.bot_name = name
+
+
+async def sync_settings(bots: List[BaseBot]):
+    """
+    Syncs the settings of the bots with Poe, the blocking HTTP call runs on
+    a thread so the event loop keeps serving
+
+    Args:
+        bots (List[BaseBot]): The bots to sync
+    """
+    logger = get_logger("main")
+    for bot in bots:
+        if not bot.bot_name or not bot.access_key:
+            logger.warning(f"Bot name or access key not set, settings of {bot.path} are not synced")
+            continue
+        try:
+            settings = await bot.get_settings(fp.SettingsRequest(version=PROTOCOL_VERSION, type="settings"))
+            await asyncio.to_thread(
+                fp.sync_bot_settings,
+                bot_name=bot.bot_name,
+                settings=settings.model_dump(),
+                access_key=bot.access_key,
+            )
+            logger.info(f"Synced settings of bot {bot.bot_name}")
+        except Exception as e:
+            logger.error(f"Bot settings sync failed for {bot.bot_name}, please sync them manually: {e}")
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import signal
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.routing import BaseRoute
+
+from configs import AppConfig, BotConfig
+from logger import get_logger
+from models import BaseBot, BotFactory
+from poe_app import make_bots_app, sync_settings
+
+
+class ConfigReloader:
+    """
+    Reloads the bots of a running app when the config file changes or when
+    the process receives SIGHUP.
+
+    Bots are matched by ``sub_url``. Only added or changed bots are built,
+    their routes are swapped into the app in one assignment, and the replaced
+    bot instances are released once their in-flight responses have finished.
+    App level settings (listen address, logging, pools) need a restart.
+
+    Args:
+        app (FastAPI): The app built by main()
+        config_path (str): Path of the config file to watch
+        app_config (AppConfig): The config the app was built from
+        interval (float): Seconds between config file checks
+    """
+
+    def __init__(self, app: FastAPI, config_path: str, app_config: AppConfig, interval: float = 2.0):
+        self.app = app
+        self.config_path = config_path
+        self.app_config = app_config
+        self.interval = interval
+        self.logger = get_logger("ConfigReloader")
+
+        self._lock = asyncio.Lock()
+        self._mtime = self._read_mtime()
+        self._task: Optional[asyncio.Task] = None
+        self._retiring: List[asyncio.Task] = []
+
+    def _read_mtime(self) -> float:
+        try:
+            return os.stat(self.config_path).st_mtime
+        except OSError:
+            return 0.0
+
+    async def start(self):
+        """
+        Start watching the config file and install the SIGHUP handler
+        """
+        loop = asyncio.get_running_loop()
+        self._task = loop.create_task(self._watch())
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self.request_reload)
+        except (NotImplementedError, AttributeError, RuntimeError):
+            # no SIGHUP on this platform or not on the main thread
+            pass
+        self.logger.info(f"Watching {self.config_path} for changes every {self.interval}s")
+
+    def request_reload(self):
+        self.logger.info("Reload requested")
+        asyncio.get_running_loop().create_task(self.reload())
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            mtime = self._read_mtime()
+            if mtime != self._mtime:
+                self._mtime = mtime
+                try:
+                    await self.reload()
+                except Exception as e:
+                    self.logger.error(f"Reload failed: {e}")
+
+    async def reload(self):
+        """
+        Reload the config and swap the changed bots
+        """
+        async with self._lock:
+            try:
+                new_config = await asyncio.to_thread(AppConfig.load_config, self.config_path)
+            except Exception as e:
+                self.logger.error(f"Failed to load {self.config_path}, keeping the current bots: {e}")
+                return
+
+            old_settings = self.app_config.model_dump(exclude={"bot_configs"})
+            if new_config.model_dump(exclude={"bot_configs"}) != old_settings:
+                self.logger.warning("App level settings changed, they take effect after a restart")
+
+            old_configs = self._by_path(self.app_config.bot_configs)
+            new_configs = self._by_path(new_config.bot_configs)
+            changed = [
+                path
+                for path, config in new_configs.items()
+                if path not in old_configs or old_configs[path] != config
+            ]
+            removed = [path for path in old_configs if path not in new_configs]
+            if not changed and not removed:
+                self.logger.info("Bot configs unchanged")
+                self.app_config = new_config
+                return
+
+            try:
+                # building models and routes can be slow, keep it off the event loop
+                new_bots, new_routes = await asyncio.to_thread(
+                    self._build, [new_configs[path] for path in changed]
+                )
+            except Exception as e:
+                self.logger.error(f"Failed to build bots, keeping the current bots: {e}")
+                return
+
+            self._swap(new_bots, new_routes, set(changed) | set(removed))
+            self.app_config = new_config
+            self.logger.info(
+                f"Reloaded bots: {len(changed)} built, {len(removed)} removed, "
+                f"{len(new_configs) - len(changed)} unchanged"
+            )
+            await sync_settings(new_bots)
+
+    @staticmethod
+    def _by_path(bot_configs: List[BotConfig]) -> Dict[str, BotConfig]:
+        return {config.sub_url: config for config in bot_configs}
+
+    @staticmethod
+    def _build(bot_configs: List[BotConfig]) -> Tuple[List[BaseBot], List[BaseRoute]]:
+        new_bots = [BotFactory.create_bot(config.to_bot_config()) for config in bot_configs]
+        if not new_bots:
+            return new_bots, []
+        # let fastapi_poe build the routes, they are moved into the live app by _swap
+        new_paths = {bot.path for bot in new_bots}
+        new_routes = [
+            route
+            for route in make_bots_app(new_bots).router.routes
+            if getattr(route, "path", None) in new_paths
+        ]
+        return new_bots, new_routes
+
+    def _swap(self, new_bots: List[BaseBot], new_routes: List[BaseRoute], replaced_paths: set):
+        bots: Dict[str, BaseBot] = dict(self.app.state.bots)
+        retired = [bots.pop(path) for path in replaced_paths if path in bots]
+        for bot in new_bots:
+            bots[bot.path] = bot
+
+        routes = [
+            route
+            for route in self.app.router.routes
+            if getattr(route, "path", None) not in replaced_paths
+        ]
+        routes.extend(new_routes)
+
+        # single assignments, requests see either the old or the new routes
+        self.app.router.routes = routes
+        self.app.state.bots = bots
+
+        for bot in retired:
+            task = asyncio.get_running_loop().create_task(self._retire(bot))
+            self._retiring.append(task)
+            task.add_done_callback(self._retiring.remove)
+
+    async def _retire(self, bot: BaseBot):
+        self.logger.info(f"Draining bot {bot.bot_name} ({bot.in_flight} in flight)")
+        await bot.drain()
+        self.logger.info(f"Released bot {bot.bot_name}")
@@ -0,0 +1,302 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from admission import AdmissionRejected, ConcurrencyLimiter
+from logger import get_logger
+
+# weight of the newest sample in the time-to-first-token EWMA
+EWMA_ALPHA = 0.3
+
+
+class Endpoint:
+    """
+    One upstream endpoint of a bot and its health and latency state
+
+    Args:
+        api_base (str): The endpoint API base URL
+        model (Any): The chat model bound to this endpoint
+        limiter (Optional[ConcurrencyLimiter]): The backend limiter of this endpoint
+    """
+
+    def __init__(self, api_base: str, model: Any, limiter: Optional[ConcurrencyLimiter] = None):
+        self.api_base = api_base
+        self.model = model
+        self.limiter = limiter
+
+        self.ewma_ttft: Optional[float] = None
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.in_flight = 0
+
+        self.requests = 0
+        self.errors = 0
+        self.ejections = 0
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def record_ttft(self, ttft: float):
+        self.record_latency(ttft)
+        self.failures = 0
+
+    def record_latency(self, latency: float):
+        if self.ewma_ttft is None:
+            self.ewma_ttft = latency
+        else:
+            self.ewma_ttft = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma_ttft
+
+    def record_failure(self, max_failures: int, eject_seconds: float) -> bool:
+        """
+        Record a failed request, ejecting the endpoint after max_failures
+        consecutive failures
+
+        Returns:
+            bool: True if the endpoint got ejected
+        """
+        self.errors += 1
+        self.failures += 1
+        if self.failures < max_failures:
+            return False
+        self.ejected_until = time.monotonic() + eject_seconds
+        self.ejections += 1
+        # once the ejection expires the next request is a probe, a single
+        # failure ejects the endpoint again
+        self.failures = max_failures - 1
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "healthy": self.is_healthy(time.monotonic()),
+            "ewma_ttft": self.ewma_ttft,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+        }
+
+
+class EndpointRouter:
+    """
+    Routes every request to the healthy endpoint with the best EWMA
+    time-to-first-token, fails over to the next endpoint when a request fails
+    before its first chunk and optionally hedges slow requests.
+
+    Args:
+        endpoints (List[Endpoint]): The endpoints of the bot
+        max_failures (int): Consecutive failures before an endpoint is ejected
+        eject_seconds (float): Seconds an ejected endpoint is skipped before it is probed again
+        hedge_after (Optional[float]): Seconds without a first chunk before a hedged request
+            is sent to the next endpoint, None to disable hedging
+        queue_wait (float): Maximum seconds to wait for a backend limiter slot
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        max_failures: int = 3,
+        eject_seconds: float = 30.0,
+        hedge_after: Optional[float] = None,
+        queue_wait: float = 10.0,
+    ):
+        self.endpoints = endpoints
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.hedge_after = hedge_after
+        self.queue_wait = queue_wait
+        self.logger = get_logger("EndpointRouter")
+
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def rank(self, exclude: Optional[List[Endpoint]] = None) -> List[Endpoint]:
+        """
+        Rank the endpoints, best first. Healthy endpoints come first, ordered
+        by EWMA time-to-first-token (unmeasured endpoints first so they get
+        measured), then the ejected ones by ejection expiry.
+        """
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if not exclude or e not in exclude]
+        healthy = [e for e in candidates if e.is_healthy(now)]
+        ejected = [e for e in candidates if not e.is_healthy(now)]
+        healthy.sort(
+            key=lambda e: (e.ewma_ttft is not None, e.ewma_ttft or 0.0, e.in_flight)
+        )
+        ejected.sort(key=lambda e: e.ejected_until)
+        return healthy + ejected
+
+    async def stream(
+        self,
+        messages: Any,
+        open_stream: Callable[[Any, Any], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        """
+        Stream the response for the given messages through the best endpoint
+
+        Args:
+            messages (Any): The prepared messages
+            open_stream (Callable): Opens the text stream of a model for the messages
+
+        Returns:
+            The response text as an async iterator
+        """
+        tried: List[Endpoint] = []
+        last_error: Optional[BaseException] = None
+
+        while len(tried) < len(self.endpoints):
+            endpoint = self.rank(exclude=tried)[0]
+            tried.append(endpoint)
+            try:
+                iterator, first = await self._start(endpoint, messages, open_stream, tried)
+            except AdmissionRejected as e:
+                last_error = e
+                continue
+            except Exception as e:
+                self.logger.warning(f"Endpoint {endpoint.api_base} failed before first chunk: {e}")
+                last_error = e
+                continue
+
+            try:
+                if first is not None:
+                    yield first
+                    async for text in iterator:
+                        yield text
+            finally:
+                await iterator.aclose()
+            return
+
+        # every endpoint is busy or failed, surface the last error
+        raise last_error if last_error is not None else RuntimeError("No endpoint available")
+
+    async def _start(
+        self,
+        endpoint: Endpoint,
+        messages: Any,
+        open_stream: Callable[[Any, Any], AsyncIterator[str]],
+        tried: List[Endpoint],
+    ):
+        """
+        Open the stream of the endpoint and wait for its first chunk, hedging
+        to the next endpoint if the first chunk is late
+
+        Returns:
+            The winning stream and its first chunk (None for an empty stream)
+        """
+        primary = _EndpointStream(self, endpoint, messages, open_stream)
+        primary.start()
+
+        hedge = None
+        if self.hedge_after is not None and len(self.endpoints) > len(tried):
+            done, _ = await asyncio.wait((primary.task,), timeout=self.hedge_after)
+            if not done:
+                backup = self.rank(exclude=tried)[0]
+                self.logger.info(
+                    f"No first chunk from {endpoint.api_base} after {self.hedge_after}s, hedging to {backup.api_base}"
+                )
+                tried.append(backup)
+                self.hedges += 1
+                hedge = _EndpointStream(self, backup, messages, open_stream)
+                hedge.start()
+
+        if hedge is None:
+            try:
+                return primary.iterator, await primary.first()
+            except BaseException:
+                await primary.cancel()
+                raise
+
+        racers = {primary.task: primary, hedge.task: hedge}
+        error: Optional[BaseException] = None
+        try:
+            while racers:
+                done, _ = await asyncio.wait(racers.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    racer = racers.pop(task)
+                    try:
+                        first = await racer.first()
+                    except Exception as e:
+                        error = e
+                        await racer.cancel()
+                        continue
+                    for loser in racers.values():
+                        # the loser took at least this long, count it as a sample
+                        loser.endpoint.record_latency(time.monotonic() - loser.start_time)
+                        await loser.cancel()
+                    racers.clear()
+                    if racer is hedge:
+                        self.hedge_wins += 1
+                    return racer.iterator, first
+        except BaseException:
+            for racer in racers.values():
+                await racer.cancel()
+            raise
+        raise error
+
+    def stats(self) -> Dict:
+        return {
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "endpoints": {e.api_base: e.stats() for e in self.endpoints},
+        }
+
+
+class _EndpointStream:
+    """
+    A stream opened on one endpoint, records its time-to-first-token and
+    failures on the endpoint
+    """
+
+    def __init__(self, router: EndpointRouter, endpoint: Endpoint, messages: Any, open_stream: Callable):
+        self.router = router
+        self.endpoint = endpoint
+        self.messages = messages
+        self.open_stream = open_stream
+        self.iterator = self._run()
+        self.task: Optional[asyncio.Future] = None
+        self.start_time = 0.0
+
+    def start(self):
+        self.start_time = time.monotonic()
+        self.task = asyncio.ensure_future(self.iterator.__anext__())
+
+    async def first(self) -> Optional[str]:
+        try:
+            return await self.task
+        except StopAsyncIteration:
+            return None
+
+    async def cancel(self):
+        if not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except BaseException:
+                pass
+        await self.iterator.aclose()
+
+    async def _run(self) -> AsyncIterator[str]:
+        endpoint = self.endpoint
+        limiter = endpoint.limiter
+        if limiter is not None:
+            await limiter.acquire(self.router.queue_wait)
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        first = True
+        try:
+            async for text in self.open_stream(endpoint.model, self.messages):
+                if first:
+                    first = False
+                    endpoint.record_ttft(time.monotonic() - self.start_time)
+                yield text
+            if first:
+                endpoint.record_ttft(time.monotonic() - self.start_time)
+        except Exception:
+            if endpoint.record_failure(self.router.max_failures, self.router.eject_seconds):
+                self.router.logger.warning(
+                    f"Ejecting endpoint {endpoint.api_base} for {self.router.eject_seconds}s"
+                )
+            raise
+        finally:
+            endpoint.in_flight -= 1
+            if limiter is not None:
+                limiter.release()
@@ -0,0 +1,222 @@
+import hashlib
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from http_pool import get_http_client_pool
+from logger import get_logger
+
+# number of recent latencies kept for the percentiles in stats()
+LATENCY_WINDOW = 1024
+
+
+class SemanticQuery:
+    """
+    The embedded last user turn of a request, with the hash of the context
+    (system messages) it was asked in
+    """
+
+    __slots__ = ("vector", "scope")
+
+    def __init__(self, vector: np.ndarray, scope: int):
+        self.vector = vector
+        self.scope = scope
+
+
+class SemanticCache:
+    """
+    Caches responses by the meaning of the question instead of its exact text.
+
+    The last user turn is embedded through an OpenAI compatible embeddings
+    endpoint (e.g. the service in bot/test.py). Past prompt embeddings are kept
+    normalized in one contiguous float32 matrix, so a lookup is a single
+    matrix product over all entries. A cached response is returned when the
+    best cosine similarity within the same context reaches ``threshold``.
+
+    Only single turn requests (system messages and one user message) are
+    cached, follow-up questions depend on the history and are not matched.
+    When ``max_entries`` is reached the least recently used entry is
+    overwritten in place.
+
+    Args:
+        api_base (str): The embeddings API base URL
+        api_key (str): The embeddings API key
+        model (str): The embedding model name
+        threshold (float): Minimum cosine similarity of a hit
+        max_entries (int): Maximum number of cached responses
+        timeout (float): Seconds an embedding call may take before the cache is skipped
+    """
+
+    def __init__(
+        self,
+        api_base: str,
+        api_key: str = "",
+        model: str = "m3e",
+        threshold: float = 0.92,
+        max_entries: int = 4096,
+        timeout: float = 1.0,
+    ):
+        self.url = f"{api_base.rstrip('/')}/embeddings"
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.model = model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # the pooled client waits minutes for upstream reads, the embedding
+        # call runs before every cacheable request and must give up quickly
+        self.timeout = timeout
+        self.client = get_http_client_pool().get_async_client(api_base)
+        self.logger = get_logger("SemanticCache")
+
+        # allocated on the first insert, once the embedding size is known
+        self._matrix: Optional[np.ndarray] = None
+        self._scopes = np.zeros(max_entries, dtype=np.int64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._responses: List[Optional[List[str]]] = [None] * max_entries
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.embed_errors = 0
+        self.evictions = 0
+        self._embed_latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._search_latencies: deque = deque(maxlen=LATENCY_WINDOW)
+
+    @staticmethod
+    def _scope(messages: List[Any]) -> int:
+        context = "\0".join(message.content for message in messages if message.type == "system")
+        digest = hashlib.blake2b(context.encode("utf-8"), digest_size=8).digest()
+        # int64 so the scopes fit in a numpy array
+        return int.from_bytes(digest, "little", signed=True)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed the given texts
+
+        Args:
+            texts (List[str]): The texts
+
+        Returns:
+            np.ndarray: The normalized float32 embeddings, one row per text
+        """
+        start = time.perf_counter()
+        response = await self.client.post(
+            self.url, json={"input": texts, "model": self.model}, headers=self.headers, timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        vectors = np.asarray([item["embedding"] for item in data], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        self._embed_latencies.append(time.perf_counter() - start)
+        return vectors
+
+    def search(self, vectors: np.ndarray, scopes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the most similar cached prompt of every query in one batch
+
+        Args:
+            vectors (np.ndarray): The normalized query embeddings, one row per query
+            scopes (np.ndarray): The context hash of every query
+
+        Returns:
+            The best entry index and its cosine similarity per query, the
+            similarity is -inf for queries without a candidate in their context
+        """
+        count = len(vectors)
+        if self._size == 0:
+            return np.zeros(count, dtype=np.int64), np.full(count, -np.inf, dtype=np.float32)
+
+        start = time.perf_counter()
+        scores = self._matrix[: self._size] @ vectors.T
+        scores[self._scopes[: self._size, None] != scopes[None, :]] = -np.inf
+        best = np.argmax(scores, axis=0)
+        best_scores = scores[best, np.arange(count)]
+        self._search_latencies.append(time.perf_counter() - start)
+        return best, best_scores
+
+    def _query_text(self, messages: List[Any]) -> Optional[str]:
+        turns = [message for message in messages if message.type != "system"]
+        if len(turns) != 1 or turns[0].type != "human" or not turns[0].content.strip():
+            return None
+        return turns[0].content
+
+    async def lookup(self, messages: List[Any]) -> Tuple[Optional[List[str]], Optional[SemanticQuery]]:
+        """
+        Look up a cached response for the given prepared messages
+
+        Args:
+            messages (List[Any]): The prepared messages
+
+        Returns:
+            The cached response chunks or None, and the query to store the
+            response under on a miss (None if the request is not cacheable)
+        """
+        text = self._query_text(messages)
+        if text is None:
+            self.skipped += 1
+            return None, None
+
+        try:
+            vector = (await self.embed([text]))[0]
+        except Exception as e:
+            # the cache is an optimization, never fail the request because of it
+            self.embed_errors += 1
+            self.logger.warning(f"Embedding failed, skipping the semantic cache: {e}")
+            return None, None
+
+        query = SemanticQuery(vector, self._scope(messages))
+        best, scores = self.search(vector[None, :], np.array([query.scope], dtype=np.int64))
+        if scores[0] >= self.threshold:
+            self.hits += 1
+            self._last_used[best[0]] = time.monotonic()
+            return self._responses[best[0]], None
+
+        self.misses += 1
+        return None, query
+
+    def set(self, query: SemanticQuery, chunks: List[str]):
+        """
+        Store a complete response under the given query
+
+        Args:
+            query (SemanticQuery): The query returned by lookup()
+            chunks (List[str]): The response chunks
+        """
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, len(query.vector)), dtype=np.float32)
+
+        if self._size < self.max_entries:
+            index = self._size
+            self._size += 1
+        else:
+            index = int(np.argmin(self._last_used))
+            self.evictions += 1
+
+        self._matrix[index] = query.vector
+        self._scopes[index] = query.scope
+        self._last_used[index] = time.monotonic()
+        self._responses[index] = chunks
+
+    @staticmethod
+    def _latency_stats(latencies: deque) -> Dict:
+        if not latencies:
+            return {"p50_ms": None, "p95_ms": None}
+        p50, p95 = np.percentile(np.fromiter(latencies, dtype=np.float64), [50, 95]) * 1000
+        return {"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3)}
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "skipped": self.skipped,
+            "embed_errors": self.embed_errors,
+            "evictions": self.evictions,
+            "embed_latency": self._latency_stats(self._embed_latencies),
+            "search_latency": self._latency_stats(self._search_latencies),
+        }
@@ -0,0 +1,133 @@
+import asyncio
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+
+class Flight:
+    """
+    One upstream stream shared by every request with the same key.
+
+    A pump task reads the upstream stream into a chunk buffer, each
+    subscriber reads the buffer at its own index. The pump never waits for a
+    subscriber, so a slow client only delays itself, and late subscribers
+    replay the chunks emitted before they joined. The pump is cancelled once
+    every subscriber is gone.
+
+    Args:
+        open_stream (Callable[[], AsyncIterator[str]]): Opens the upstream stream
+        on_close (Callable[[], None]): Called once the flight stops accepting subscribers
+    """
+
+    def __init__(self, open_stream: Callable[[], AsyncIterator[str]], on_close: Callable[[], None]):
+        self.open_stream = open_stream
+        self.on_close = on_close
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def _close(self):
+        if not self._closed:
+            self._closed = True
+            self.on_close()
+
+    def _notify(self):
+        # wake the waiting subscribers, later waiters get a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _pump(self):
+        try:
+            async for text in self.open_stream():
+                self.chunks.append(text)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._close()
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """
+        Stream the chunks of the flight from the first one
+
+        Returns:
+            The text chunks as an async iterator
+        """
+        self.subscribers += 1
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._pump())
+        index = 0
+        try:
+            while True:
+                if index < len(self.chunks):
+                    index += 1
+                    yield self.chunks[index - 1]
+                    continue
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                # nobody is listening anymore, stop the upstream stream
+                self._close()
+                self._task.cancel()
+
+
+class SingleFlight:
+    """
+    Deduplicates identical concurrent requests: the first request with a key
+    opens the upstream stream, requests with the same key arriving while it
+    is in flight subscribe to a broadcast of its chunks instead of opening
+    their own. Finished streams are not replayed, that is the cache's job.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+
+        self.leaders = 0
+        self.followers = 0
+
+    def stream(self, key: str, open_stream: Callable[[], AsyncIterator[str]]) -> Tuple[AsyncIterator[str], bool]:
+        """
+        Stream the response for the given key, joining the flight in progress
+        if there is one
+
+        Args:
+            key (str): The request key, e.g. the response cache key
+            open_stream (Callable[[], AsyncIterator[str]]): Opens the upstream
+                stream, only called by the leader
+
+        Returns:
+            The text chunks as an async iterator and whether this request leads the flight
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.followers += 1
+            return flight.subscribe(), False
+
+        def on_close():
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+        flight = Flight(open_stream, on_close)
+        self._flights[key] = flight
+        self.leaders += 1
+        return flight.subscribe(), True
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "followers": self.followers,
+        }
@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+
+class StartupTimer:
+    """
+    Collects the duration of the startup phases (imports, config parsing,
+    per bot init, app build) for the startup report
+    """
+
+    def __init__(self):
+        self.phases: List[Tuple[str, float]] = []
+
+    def record(self, name: str, seconds: float):
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    @property
+    def total(self) -> float:
+        return sum(seconds for _, seconds in self.phases)
+
+    def to_dict(self) -> Dict:
+        return {
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases},
+            "total": round(self.total, 4),
+        }
+
+    def report(self) -> str:
+        width = max((len(name) for name, _ in self.phases), default=5)
+        lines = ["Startup timing:"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<{width}}  {seconds * 1000:9.1f}ms")
+        lines.append(f"  {'total':<{width}}  {self.total * 1000:9.1f}ms")
+        return "\n".join(lines)
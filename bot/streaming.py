@@ -0,0 +1,116 @@
+import asyncio
+from typing import AsyncIterator, Dict, List
+
+
+class ChunkCoalescer:
+    """
+    Merges small upstream chunks into fewer, larger frames.
+
+    The first chunk is always emitted immediately so time-to-first-token is
+    unchanged. After that, chunks are buffered and flushed when the buffer
+    reaches ``max_bytes`` or when ``window_ms`` has passed since the first
+    buffered chunk, whichever comes first.
+
+    Args:
+        window_ms (int): The flush time window in milliseconds
+        max_bytes (int): The flush size threshold in bytes
+    """
+
+    def __init__(self, window_ms: int = 30, max_bytes: int = 512):
+        self.window = window_ms / 1000
+        self.max_bytes = max_bytes
+
+        self.chunks_in = 0
+        self.frames_out = 0
+
+    async def coalesce(self, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Coalesce the given chunk stream
+
+        Args:
+            chunks (AsyncIterator[str]): The upstream text chunks
+
+        Returns:
+            The coalesced frames as an async iterator
+        """
+        loop = asyncio.get_running_loop()
+        iterator = chunks.__aiter__()
+        buffer: List[str] = []
+        size = 0
+        deadline = 0.0
+        first = True
+        pending = None
+
+        try:
+            while True:
+                if buffer:
+                    # wait for the next chunk, but not past the flush deadline
+                    if pending is None:
+                        pending = asyncio.ensure_future(iterator.__anext__())
+                    done, _ = await asyncio.wait(
+                        (pending,), timeout=max(deadline - loop.time(), 0)
+                    )
+                    if not done:
+                        self.frames_out += 1
+                        yield "".join(buffer)
+                        buffer.clear()
+                        size = 0
+                        continue
+                    task, pending = pending, None
+                    try:
+                        text = task.result()
+                    except StopAsyncIteration:
+                        break
+                elif pending is not None:
+                    task, pending = pending, None
+                    try:
+                        text = await task
+                    except StopAsyncIteration:
+                        break
+                else:
+                    try:
+                        text = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+
+                self.chunks_in += 1
+                if not text:
+                    continue
+                if first:
+                    first = False
+                    self.frames_out += 1
+                    yield text
+                    continue
+
+                if not buffer:
+                    deadline = loop.time() + self.window
+                buffer.append(text)
+                size += len(text.encode("utf-8"))
+                if size >= self.max_bytes:
+                    self.frames_out += 1
+                    yield "".join(buffer)
+                    buffer.clear()
+                    size = 0
+
+            if buffer:
+                self.frames_out += 1
+                yield "".join(buffer)
+        finally:
+            if pending is not None:
+                pending.cancel()
+                # the iterator can only be closed once the cancelled step has finished
+                try:
+                    await pending
+                except BaseException:
+                    pass
+            # close the upstream right away, it holds the backend limiter slot
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+
+    def stats(self) -> Dict:
+        return {
+            "chunks_in": self.chunks_in,
+            "frames_out": self.frames_out,
+            "window_ms": int(self.window * 1000),
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,232 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import fastapi_poe as fp
+
+from conversation import message_identity
+from logger import get_logger
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You compress chat histories. Write a concise summary of the conversation "
+    "below, keeping facts, names, numbers, decisions, open questions and the "
+    "user's preferences. Do not add anything that was not said. Reply with the "
+    "summary only."
+)
+
+SUMMARY_ROLES = {"user": "User", "bot": "Assistant"}
+
+
+def format_transcript(summary: Optional[str], messages: List[fp.ProtocolMessage]) -> str:
+    """
+    Formats the messages to summarize, after the previous summary if any
+
+    Args:
+        summary (Optional[str]): The summary of the messages before these
+        messages (List[fp.ProtocolMessage]): The messages to add to the summary
+
+    Returns:
+        The user prompt of the summary request
+    """
+    parts = []
+    if summary:
+        parts.append(f"Summary so far:\n{summary}\n")
+        parts.append("New messages:")
+    for message in messages:
+        role = SUMMARY_ROLES.get(message.role)
+        if role is not None:
+            parts.append(f"{role}: {message.content}")
+    return "\n".join(parts)
+
+
+class SummaryState:
+    """
+    The running summary of one conversation, covering ``request.query[:covered]``
+    """
+
+    __slots__ = ("summary", "covered", "last_id", "generation", "pending", "last_used")
+
+    def __init__(self):
+        self.summary: Optional[str] = None
+        self.covered = 0
+        self.last_id: Any = None
+        # bumped on divergence, results of older summary tasks are dropped
+        self.generation = 0
+        self.pending: Optional[asyncio.Task] = None
+        self.last_used = 0.0
+
+    def reset(self):
+        self.summary = None
+        self.covered = 0
+        self.last_id = None
+        self.generation += 1
+        if self.pending is not None:
+            self.pending.cancel()
+            self.pending = None
+
+
+class ConversationSummarizer:
+    """
+    Compresses the old turns of long conversations into a running summary,
+    generated in the background so it never delays a reply. A turn uses the
+    summary that is ready when it arrives, the summary of the turns since
+    then is built while the reply streams.
+
+    Once ``after`` messages older than the newest ``keep`` are not covered
+    by the summary, they are folded into it, so a prompt of the summary and
+    the uncovered messages holds fewer than ``after + keep`` raw messages.
+    The summary is checked against the request by the id of the last
+    covered message, and dropped when the history diverged before it.
+
+    Conversations are evicted when unused for ``ttl`` seconds, and least
+    recently used first when there are more than ``max_entries`` of them.
+
+    Args:
+        summarize (Callable): Folds messages into a summary, called with the
+            previous summary (or None) and the messages
+        after (int): Number of uncovered messages starting a summary
+        keep (int): Number of newest messages never summarized
+        max_entries (int): Maximum number of conversations
+        ttl (float): Seconds an unused conversation is kept
+        max_concurrency (int): Maximum number of summaries generated at once
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[Optional[str], List[fp.ProtocolMessage]], Awaitable[str]],
+        after: int = 4,
+        keep: int = 4,
+        max_entries: int = 1024,
+        ttl: float = 3600,
+        max_concurrency: int = 2,
+    ):
+        self.summarize = summarize
+        self.after = after
+        self.keep = keep
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_concurrency = max_concurrency
+        self.logger = get_logger("ConversationSummarizer")
+        self._states: "OrderedDict[str, SummaryState]" = OrderedDict()
+        self._running = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.diverged = 0
+        self.started = 0
+        self.skipped = 0
+        self.completed = 0
+        self.failed = 0
+        self.evictions = 0
+
+    def lookup(self, conversation_id: str, query: List[fp.ProtocolMessage]) -> Tuple[Optional[str], int]:
+        """
+        Gets the summary of the conversation and starts folding the older
+        turns into it in the background when enough have piled up
+
+        Args:
+            conversation_id (str): The conversation id of the request
+            query (List[fp.ProtocolMessage]): The full history of the request
+
+        Returns:
+            The summary (None if there is none yet) and the number of leading
+            query messages it covers
+        """
+        now = time.monotonic()
+        state = self._states.get(conversation_id)
+        if state is None:
+            state = SummaryState()
+            self._states[conversation_id] = state
+        else:
+            self._states.move_to_end(conversation_id)
+        state.last_used = now
+
+        if state.covered and (
+            state.covered > len(query) or message_identity(query[state.covered - 1]) != state.last_id
+        ):
+            self.diverged += 1
+            state.reset()
+
+        end = len(query) - self.keep
+        if state.pending is None and end - state.covered >= self.after:
+            if self._running < self.max_concurrency:
+                self._start(conversation_id, state, query, end)
+            else:
+                # tried again on the next turn
+                self.skipped += 1
+
+        self._evict(now)
+        if state.summary is None:
+            self.misses += 1
+            return None, 0
+        self.hits += 1
+        return state.summary, state.covered
+
+    def _start(self, conversation_id: str, state: SummaryState, query: List[fp.ProtocolMessage], end: int):
+        self._running += 1
+        self.started += 1
+        state.pending = asyncio.create_task(
+            self._run(
+                conversation_id,
+                state,
+                state.generation,
+                state.summary,
+                query[state.covered : end],
+                end,
+                message_identity(query[end - 1]),
+            )
+        )
+
+    async def _run(
+        self,
+        conversation_id: str,
+        state: SummaryState,
+        generation: int,
+        summary: Optional[str],
+        messages: List[fp.ProtocolMessage],
+        end: int,
+        last_id: Any,
+    ):
+        try:
+            text = await self.summarize(summary, messages)
+            if state.generation != generation:
+                return
+            if text:
+                state.summary = text
+                state.covered = end
+                state.last_id = last_id
+            self.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            self.logger.warning(f"Summary of conversation {conversation_id} failed: {e}")
+        finally:
+            self._running -= 1
+            if state.generation == generation:
+                state.pending = None
+
+    def _evict(self, now: float):
+        while self._states:
+            conversation_id, state = next(iter(self._states.items()))
+            if now - state.last_used <= self.ttl and len(self._states) <= self.max_entries:
+                break
+            del self._states[conversation_id]
+            state.reset()
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        return {
+            "conversations": len(self._states),
+            "summaries": sum(1 for state in self._states.values() if state.summary is not None),
+            "running": self._running,
+            "hits": self.hits,
+            "misses": self.misses,
+            "diverged": self.diverged,
+            "started": self.started,
+            "skipped": self.skipped,
+            "completed": self.completed,
+            "failed": self.failed,
+            "evictions": self.evictions,
+        }
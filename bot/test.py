@@ -1,19 +1,51 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sentence_transformers import SentenceTransformer
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 import uvicorn
-import tiktoken
+import asyncio
+import json
+import multiprocessing
 import numpy as np
 from scipy.interpolate import interp1d
-from typing import List
-from sklearn.preprocessing import PolynomialFeatures
-import torch
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Literal
 import os
 
+import embedding_worker
+from embedding_store import EmbeddingCache, EmbeddingStore, embedding_key
+from embedding_utils import encode_base64, expand_features_batch, normalize_rows
+
+# orjson 可选, 安装后直接序列化 numpy 数组 (optional, serializes numpy arrays directly)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # 环境变量传入
 sk_key = os.environ.get("sk-key", "sk-aaabbbcccdddeeefffggghhhiiijjjkkk")
+# 动态批处理: 一个批次最多的文本数和最长等待时间 (毫秒)
+# (Micro-batching: max texts per batch and max wait in ms)
+batch_max_size = int(os.environ.get("EMBEDDING_BATCH_MAX_SIZE", "32"))
+batch_max_wait_ms = float(os.environ.get("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+# 推理和 token 计数的执行器: thread / process / inline (inline 在事件循环里同步运行, 仅用于对比测试)
+# (Executor of inference and token counting: thread / process / inline,
+# inline runs on the event loop like before and is only meant for benchmarks)
+executor_kind = os.environ.get("EMBEDDING_EXECUTOR", "thread")
+executor_workers = int(os.environ.get("EMBEDDING_EXECUTOR_WORKERS", "1"))
+model_path = os.environ.get("EMBEDDING_MODEL_PATH", "./moka-ai_m3e-large")
+# 嵌入缓存目录, 为空时不缓存; 内存 LRU 的最大条数
+# (Embedding cache directory, disabled when empty; max vectors of the memory LRU)
+cache_dir = os.environ.get("EMBEDDING_CACHE_DIR", "")
+cache_max_entries = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "10000"))
+# 推理后端: torch / onnx (CPU), onnx 可选 int8 量化和线程数
+# (Inference backend: torch or onnx on the CPU, with optional int8 quantization and thread count)
+backend = os.environ.get("EMBEDDING_BACKEND", "torch")
+onnx_dir = os.environ.get("EMBEDDING_ONNX_DIR", f"{model_path.rstrip('/')}-onnx")
+onnx_quantize = os.environ.get("EMBEDDING_ONNX_QUANTIZE", "false").lower() in ("1", "true", "yes")
+onnx_threads = int(os.environ.get("EMBEDDING_ONNX_THREADS", "0"))
 
 # 创建一个FastAPI实例
 app = FastAPI()
@@ -30,19 +62,191 @@ app.add_middleware(
 security = HTTPBearer()
 
 # 预加载模型
-device = torch.device(
-    "cuda" if torch.cuda.is_available() else "cpu"
-)  # 检测是否有GPU可用，如果有 则使用cuda设备，否则使用cpu设备
-if torch.cuda.is_available():
-    print("本次加载模型的设备为GPU: ", torch.cuda.get_device_name(0))
+if backend == "onnx":
+    from onnx_backend import export_onnx
+
+    # 只导出一次, 之后直接加载 (exported once, loaded directly afterwards)
+    onnx_path = export_onnx(model_path, onnx_dir, onnx_quantize)
+    device = "cpu"
+    print("本次加载模型的后端为 ONNX (CPU): ", onnx_path)
+elif backend == "torch":
+    import torch
+
+    onnx_path = ""
+    device = torch.device(
+        "cuda" if torch.cuda.is_available() else "cpu"
+    )  # 检测是否有GPU可用，如果有 则使用cuda设备，否则使用cpu设备
+    if torch.cuda.is_available():
+        print("本次加载模型的设备为GPU: ", torch.cuda.get_device_name(0))
+    else:
+        print("本次加载模型的设备为CPU.")
 else:
-    print("本次加载模型的设备为CPU.")
-model = SentenceTransformer("./moka-ai_m3e-large", device=device)
+    raise ValueError(f"Invalid EMBEDDING_BACKEND: {backend}")
+# 缓存键里的模型名, 不同后端的向量不混用 (model name of the cache keys, backends do not share vectors)
+model_name = f"{model_path}:{os.path.basename(onnx_path) or backend}"
+
+
+def create_executor():
+    if executor_kind == "process":
+        # 每个进程加载一次模型, spawn 避免 fork 后的 CUDA/线程问题
+        # (every process loads the model once, spawn avoids CUDA and thread issues of fork)
+        return ProcessPoolExecutor(
+            max_workers=executor_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=embedding_worker.init_worker,
+            initargs=(model_path, str(device), onnx_path, onnx_threads),
+        )
+    if executor_kind not in ("thread", "inline"):
+        raise ValueError(f"Invalid EMBEDDING_EXECUTOR: {executor_kind}")
+    embedding_worker.init_worker(model_path, str(device), onnx_path, onnx_threads)
+    if executor_kind == "inline":
+        return None
+    return ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="embedding")
+
+
+executor = create_executor()
+
+
+async def run_in_executor(func, *args):
+    if executor is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+class MicroBatcher:
+    """
+    把并发请求的文本合并成一个批次, 调用一次 model.encode
+    (Gathers the texts of concurrent requests into one batched model.encode call)
+
+    A batch is sent once it holds max_size texts or max_wait_ms passed since
+    its first request. A request larger than max_size is encoded on its own.
+    Up to ``concurrency`` batches run at the same time, one per executor worker.
+    """
+
+    def __init__(self, max_size: int, max_wait_ms: float, concurrency: int = 1):
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(concurrency)
+        self.task = None
+
+        # 批大小直方图 (batch size histogram)
+        self.batch_sizes = Counter()
+        self.texts = 0
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            size = len(items[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in items for text in item_texts]
+            self.batch_sizes[len(texts)] += 1
+            self.texts += len(texts)
+            # 等待空闲的执行器, 然后在后台编码, 继续收集下一个批次
+            # (wait for a free executor worker, then encode in the background and gather the next batch)
+            await self.slots.acquire()
+            loop.create_task(self.encode_batch(items, texts))
+
+    async def encode_batch(self, items: list, texts: List[str]):
+        try:
+            embeddings = await run_in_executor(
+                embedding_worker.encode_texts, texts, max(len(texts), 1)
+            )
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.slots.release()
+
+        start = 0
+        for item_texts, future in items:
+            if not future.done():
+                future.set_result(embeddings[start : start + len(item_texts)])
+            start += len(item_texts)
+
+    def stats(self) -> dict:
+        batches = sum(self.batch_sizes.values())
+        return {
+            "max_size": self.max_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": batches,
+            "texts": self.texts,
+            "mean_batch_size": self.texts / batches if batches else None,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+        }
+
+
+batcher = MicroBatcher(
+    batch_max_size, batch_max_wait_ms, executor_workers if executor is not None else 1
+)
+
+
+cache = EmbeddingCache(EmbeddingStore(cache_dir), cache_max_entries) if cache_dir else None
+
+
+async def encode_with_cache(texts: List[str]) -> np.ndarray:
+    """
+    先查缓存, 只把未命中的文本交给模型
+    (Look up the cache first, only the misses go to the model)
+    """
+    if cache is None:
+        return await batcher.encode(texts)
+
+    keys = [embedding_key(model_name, text) for text in texts]
+    vectors = cache.get_many(keys)
+    # 同一请求里重复的文本只计算一次 (repeated texts of a request are embedded once)
+    missing: dict = {}
+    for index, vector in enumerate(vectors):
+        if vector is None:
+            missing.setdefault(keys[index], []).append(index)
+    if missing:
+        first = [indices[0] for indices in missing.values()]
+        computed = await batcher.encode([texts[index] for index in first])
+        # 内存 LRU 只在事件循环中修改, 写文件放到线程中
+        # (the memory LRU is only changed on the event loop, the store append runs on a thread)
+        cache.put_many(list(missing), computed)
+        await asyncio.to_thread(cache.store.append, list(missing), computed)
+        for vector, indices in zip(computed, missing.values()):
+            for index in indices:
+                vectors[index] = vector
+    if not vectors:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.stack(vectors)
+
+
+@app.on_event("startup")
+async def start_batcher():
+    batcher.start()
 
 
 class EmbeddingRequest(BaseModel):
     input: List[str]
     model: str
+    encoding_format: Literal["float", "base64"] = "float"
 
 
 class EmbeddingResponse(BaseModel):
@@ -52,13 +256,6 @@ class EmbeddingResponse(BaseModel):
     usage: dict
 
 
-def num_tokens_from_string(string: str) -> int:
-    """Returns the number of tokens in a text string."""
-    encoding = tiktoken.get_encoding("cl100k_base")
-    num_tokens = len(encoding.encode(string))
-    return num_tokens
-
-
 # 插值法
 def interpolate_vector(vector, target_length):
     original_indices = np.arange(len(vector))
@@ -67,21 +264,6 @@ def interpolate_vector(vector, target_length):
     return f(target_indices)
 
 
-def expand_features(embedding, target_length):
-    poly = PolynomialFeatures(degree=2)
-    expanded_embedding = poly.fit_transform(embedding.reshape(1, -1))
-    expanded_embedding = expanded_embedding.flatten()
-    if len(expanded_embedding) > target_length:
-        # 如果扩展后的特征超过目标长度，可以通过截断或其他方法来减少维度
-        expanded_embedding = expanded_embedding[:target_length]
-    elif len(expanded_embedding) < target_length:
-        # 如果扩展后的特征少于目标长度，可以通过填充或其他方法来增加维度
-        expanded_embedding = np.pad(
-            expanded_embedding, (0, target_length - len(expanded_embedding))
-        )
-    return expanded_embedding
-
-
 @app.post("/v1/embeddings", response_model=EmbeddingResponse)
 async def get_embeddings(
     request: EmbeddingRequest,
@@ -94,24 +276,32 @@ async def get_embeddings(
             detail="Invalid authorization code",
         )
 
-    # 计算嵌入向量和tokens数量
-    embeddings = [model.encode(text) for text in request.input]
+    # 计算嵌入向量和tokens数量, 都在执行器中运行 (both run on the executor)
+    embeddings, (prompt_tokens, total_tokens) = await asyncio.gather(
+        encode_with_cache(request.input),
+        run_in_executor(embedding_worker.count_tokens, request.input),
+    )
 
     # 如果嵌入向量的维度不为1536，则使用插值法扩展至1536维度
     # embeddings = [interpolate_vector(embedding, 1536) if len(embedding) < 1536 else embedding for embedding in embeddings]
     # 如果嵌入向量的维度不为1536，则使用特征扩展法扩展至1536维度
-    embeddings = [
-        expand_features(embedding, 1536) if len(embedding) < 1536 else embedding
-        for embedding in embeddings
-    ]
+    # 整个批次一次完成, 只计算需要的 1536 列 (whole batch at once, only the kept columns)
+    if embeddings.shape[1] < 1536:
+        embeddings = expand_features_batch(embeddings, 1536)
 
     # Min-Max normalization
     # embeddings = [(embedding - np.min(embedding)) / (np.max(embedding) - np.min(embedding)) if np.max(embedding) != np.min(embedding) else embedding for embedding in embeddings]
-    embeddings = [embedding / np.linalg.norm(embedding) for embedding in embeddings]
-    # 将numpy数组转换为列表
-    embeddings = [embedding.tolist() for embedding in embeddings]
-    prompt_tokens = sum(len(text.split()) for text in request.input)
-    total_tokens = sum(num_tokens_from_string(text) for text in request.input)
+    embeddings = normalize_rows(embeddings)
+
+    if request.encoding_format == "base64":
+        # float32 原始字节的 base64, 不逐个元素转换 (raw float32 bytes, no per element conversion)
+        embeddings = encode_base64(embeddings)
+    elif orjson is None:
+        # 将numpy数组转换为列表
+        embeddings = embeddings.tolist()
+    else:
+        # orjson 直接序列化每一行 float32 数组 (orjson serializes the float32 rows as is)
+        embeddings = list(embeddings.astype(np.float32, copy=False))
 
     response = {
         "data": [
@@ -126,7 +316,21 @@ async def get_embeddings(
         },
     }
 
-    return response
+    # 直接返回序列化后的响应, 跳过 response_model 对上万个浮点数的校验
+    # (serialize here, skipping the response_model validation of every float)
+    if orjson is not None:
+        return Response(orjson.dumps(response, option=orjson.OPT_SERIALIZE_NUMPY), media_type="application/json")
+    return Response(json.dumps(response), media_type="application/json")
+
+
+@app.get("/stats")
+def stats():
+    return {
+        "backend": backend,
+        "executor": {"kind": executor_kind, "workers": executor_workers},
+        "batcher": batcher.stats(),
+        "cache": cache.stats() if cache is not None else None,
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+import hashlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict
+
+from logger import get_logger
+
+if TYPE_CHECKING:
+    import tiktoken
+
+# fixed per message overhead of the chat format (role and separators)
+TOKENS_PER_MESSAGE = 4
+
+
+def get_encoding(model: str) -> "tiktoken.Encoding":
+    """
+    Get the tokenizer of the given model, falls back to cl100k_base for models
+    unknown to tiktoken (e.g. ollama models)
+
+    Args:
+        model (str): The model name
+
+    Returns:
+        tiktoken.Encoding: The tokenizer
+    """
+    # imported here, only bots with max_prompt_tokens need it
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        get_logger("TokenCounter").info(
+            f"No tokenizer known for model {model}, falling back to cl100k_base"
+        )
+        return tiktoken.get_encoding("cl100k_base")
+
+
+class TokenCounter:
+    """
+    Counts message tokens for a model, memoizing the counts by content hash so
+    that the history of a long conversation is only tokenized once.
+
+    Args:
+        model (str): The model name used to pick the tokenizer
+        max_entries (int): Maximum number of memoized counts
+    """
+
+    def __init__(self, model: str, max_entries: int = 8192):
+        self.encoding = get_encoding(model)
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[bytes, int]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens of the given text
+
+        Args:
+            text (str): The text
+
+        Returns:
+            int: The number of tokens
+        """
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        count = self._counts.get(key)
+        if count is not None:
+            self._counts.move_to_end(key)
+            self.hits += 1
+            return count
+
+        self.misses += 1
+        count = len(self.encoding.encode(text, disallowed_special=()))
+        self._counts[key] = count
+        if len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+        return count
+
+    def count_message(self, content: str) -> int:
+        """
+        Count the tokens of a chat message including the per message overhead
+
+        Args:
+            content (str): The message content
+
+        Returns:
+            int: The number of tokens
+        """
+        return self.count(content) + TOKENS_PER_MESSAGE
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._counts),
+            "hits": self.hits,
+            "misses": self.misses,
+        }